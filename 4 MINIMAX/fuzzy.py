@@ -0,0 +1,318 @@
+import os
+import tempfile
+import weakref
+
+import numpy as np
+
+
+# Ordered set of element labels with a label -> position map. Universes are interned: building
+# one from the same labels again returns the same object, so relations over equal universes
+# are aligned with an identity check instead of a label-by-label comparison.
+class Universe:
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, labels):
+        if isinstance(labels, Universe):
+            return labels
+        labels = tuple(labels)
+        universe = cls._interned.get(labels)
+        if universe is None:
+            universe = super().__new__(cls)
+            universe.labels = labels
+            universe.index = {label: i for i, label in enumerate(labels)}
+            if len(universe.index) != len(labels):
+                raise ValueError("Universe labels must be unique")
+            cls._interned[labels] = universe
+        return universe
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __repr__(self):
+        return f"Universe({list(self.labels)!r})"
+
+    def union(self, other):
+        """Labels of self, then the labels only in other"""
+        if other is self:
+            return self
+        return Universe(self.labels + tuple(label for label in other.labels if label not in self.index))
+
+    def intersection(self, other):
+        """Labels in both, in the order of self"""
+        if other is self:
+            return self
+        return Universe(label for label in self.labels if label in other.index)
+
+    def positions(self, labels):
+        """Positions of the given labels, which must all be in the universe"""
+        return np.fromiter((self.index[label] for label in labels), dtype=np.intp, count=len(labels))
+
+
+# Elements per broadcast tile of a composition: (row block, shared elements, column block)
+COMPOSITION_BLOCK = 1 << 22
+
+
+# Fuzzy relation between the elements of two universes, stored as a dense (rows, cols)
+# membership matrix. Pairs outside the universes have membership 0. A floating membership
+# matrix keeps its precision (float32 halves memory for large relations); any other input
+# (bool, integer, nested lists) is converted to float64.
+# The dict form of the notebook ({(x, y): membership}) is available through from_dict/to_dict.
+class FuzzyRelation:
+    def __init__(self, membership, rows, cols):
+        self.rows = Universe(rows)
+        self.cols = Universe(cols)
+        membership = np.asarray(membership)
+        if not np.issubdtype(membership.dtype, np.floating):
+            membership = membership.astype(np.float64)
+        self.membership = membership
+        if self.membership.shape != (len(self.rows), len(self.cols)):
+            raise ValueError(f"membership has shape {self.membership.shape}, "
+                             f"universes have {(len(self.rows), len(self.cols))}")
+
+    @classmethod
+    def from_dict(cls, relation, rows=None, cols=None, dtype=float):
+        """Relation from {(x, y): membership}; the universes default to the labels in order of appearance"""
+        if rows is None:
+            rows = dict.fromkeys(x for x, _ in relation)
+        if cols is None:
+            cols = dict.fromkeys(y for _, y in relation)
+        rows, cols = Universe(rows), Universe(cols)
+        membership = np.zeros((len(rows), len(cols)), dtype=dtype)
+        if relation:
+            pairs = list(relation)
+            membership[rows.positions([x for x, _ in pairs]), cols.positions([y for _, y in pairs])] = \
+                list(relation.values())
+        return cls(membership, rows, cols)
+
+    def to_dict(self, drop_zeros=False):
+        """The relation as {(x, y): membership}, optionally without the 0 entries"""
+        if drop_zeros:
+            i, j = np.nonzero(self.membership)
+        else:
+            i, j = np.indices(self.membership.shape).reshape(2, -1)
+        values = self.membership[i, j].tolist()
+        return {(self.rows.labels[x], self.cols.labels[y]): value for x, y, value in zip(i, j, values)}
+
+    @classmethod
+    def cartesian_product(cls, A, B):
+        """A × B of two fuzzy sets given as {element: membership}: min(A[x], B[y])"""
+        return cls(np.minimum.outer(np.fromiter(A.values(), dtype=float, count=len(A)),
+                                    np.fromiter(B.values(), dtype=float, count=len(B))), A, B)
+
+    @property
+    def shape(self):
+        return self.membership.shape
+
+    def __getitem__(self, pair):
+        x, y = pair
+        if x not in self.rows.index or y not in self.cols.index:
+            return 0.0
+        return float(self.membership[self.rows.index[x], self.cols.index[y]])
+
+    def __repr__(self):
+        return f"FuzzyRelation({len(self.rows)} x {len(self.cols)})"
+
+    def aligned(self, rows, cols):
+        """Membership matrix over other universes: missing pairs are 0, extra ones are dropped"""
+        rows, cols = Universe(rows), Universe(cols)
+        if rows is self.rows and cols is self.cols:
+            return self.membership
+        out = np.zeros((len(rows), len(cols)), dtype=self.membership.dtype)
+        row_src, row_dst = _common_positions(self.rows, rows)
+        col_src, col_dst = _common_positions(self.cols, cols)
+        out[np.ix_(row_dst, col_dst)] = self.membership[np.ix_(row_src, col_src)]
+        return out
+
+    # Element-wise operations, over the same universes as the dict functions of the notebook
+
+    def union(self, other):
+        rows, cols = self.rows.union(other.rows), self.cols.union(other.cols)
+        return FuzzyRelation(np.maximum(self.aligned(rows, cols), other.aligned(rows, cols)), rows, cols)
+
+    def intersection(self, other):
+        rows, cols = self.rows.intersection(other.rows), self.cols.intersection(other.cols)
+        return FuzzyRelation(np.minimum(self.aligned(rows, cols), other.aligned(rows, cols)), rows, cols)
+
+    def complement(self):
+        return FuzzyRelation(1 - self.membership, self.rows, self.cols)
+
+    def difference(self, other):
+        """min(self, 1 - other), over the universes of self"""
+        return FuzzyRelation(np.minimum(self.membership, 1 - other.aligned(self.rows, self.cols)),
+                             self.rows, self.cols)
+
+    __or__ = union
+    __and__ = intersection
+    __invert__ = complement
+    __sub__ = difference
+
+    # Compositions; only the elements shared by self.cols and other.rows take part, as in the
+    # dict versions. The result covers every (x, z) pair. Absent pairs count as membership 0,
+    # whereas min_max_composition on dicts skips them, so the two only differ for dict
+    # relations that leave pairs out
+
+    def max_min(self, other, block_elements=COMPOSITION_BLOCK):
+        """Max–min composition: T[x, z] = max over y of min(self[x, y], other[y, z])"""
+        shared = self.cols.intersection(other.rows)
+        return FuzzyRelation(max_min_matrix(self.aligned(self.rows, shared), other.aligned(shared, other.cols),
+                                            block_elements), self.rows, other.cols)
+
+    def min_max(self, other, block_elements=COMPOSITION_BLOCK):
+        """Min–max composition: T[x, z] = min over y of max(self[x, y], other[y, z])"""
+        shared = self.cols.intersection(other.rows)
+        return FuzzyRelation(min_max_matrix(self.aligned(self.rows, shared), other.aligned(shared, other.cols),
+                                            block_elements), self.rows, other.cols)
+
+    __matmul__ = max_min
+
+    # Closure and powers of a relation on one universe (rows and cols the same). allocate(shape,
+    # dtype) creates the working matrices, e.g. memmap_allocator(directory) to keep them on disk
+
+    def transitive_closure(self, block_elements=COMPOSITION_BLOCK, allocate=np.empty):
+        """Max–min transitive closure: the smallest max–min transitive relation containing self"""
+        self._require_square()
+        closure, _ = transitive_closure_matrix(self.membership, block_elements, allocate)
+        return FuzzyRelation(closure, self.rows, self.cols)
+
+    def power(self, k, block_elements=COMPOSITION_BLOCK, allocate=np.empty):
+        """k-th max–min power self ∘ ... ∘ self (the identity relation for k = 0)"""
+        self._require_square()
+        return FuzzyRelation(power_matrix(self.membership, k, block_elements, allocate), self.rows, self.cols)
+
+    def _require_square(self):
+        if self.rows is not self.cols:
+            raise ValueError("Closure and powers need a relation whose rows and columns are one universe")
+
+
+def max_min_matrix(R, S, block_elements=COMPOSITION_BLOCK, out=None):
+    """Max–min product of two membership matrices (0 where nothing is shared)"""
+    return _compose(R, S, np.minimum, np.max, 0.0, block_elements, out)
+
+
+def min_max_matrix(R, S, block_elements=COMPOSITION_BLOCK, out=None):
+    """Min–max product of two membership matrices (1 where nothing is shared)"""
+    return _compose(R, S, np.maximum, np.min, 1.0, block_elements, out)
+
+
+def _compose(R, S, combine, reduce, empty, block_elements, out):
+    # One (row block, shared, column block) tile at a time, so no temporary exceeds
+    # block_elements elements however large the relations are
+    n_rows, n_shared = R.shape
+    n_cols = S.shape[1]
+    if out is None:
+        out = np.empty((n_rows, n_cols), dtype=np.result_type(R, S))
+    if n_shared == 0:
+        out.fill(empty)
+        return out
+
+    col_block = max(1, min(n_cols, block_elements // n_shared))
+    row_block = max(1, block_elements // (n_shared * col_block))
+    for row in range(0, n_rows, row_block):
+        R_block = R[row:row + row_block, :, None]
+        for col in range(0, n_cols, col_block):
+            tile = combine(R_block, S[None, :, col:col + col_block])
+            reduce(tile, axis=1, out=out[row:row + row_block, col:col + col_block])
+    return out
+
+
+def transitive_closure_matrix(M, block_elements=COMPOSITION_BLOCK, allocate=np.empty):
+    """
+    Max–min transitive closure of a square membership matrix by repeated squaring.
+
+    T <- max(T, T ∘ T) doubles the path length T accounts for, so the loop
+    reaches the fixed point after at most ceil(log2 n) + 1 compositions; it
+    stops as soon as a step changes nothing. Returns the closure and the
+    number of compositions. Only two n x n matrices are used, both from
+    allocate, and they are read and written in tiles of about block_elements.
+    """
+    n = len(M)
+    closure = allocate(M.shape, M.dtype)
+    squared = allocate(M.shape, M.dtype)
+    block_rows = max(1, block_elements // max(1, n))
+    _copy_blocks(M, closure, block_rows)
+
+    compositions = 0
+    while True:
+        max_min_matrix(closure, closure, block_elements, out=squared)
+        compositions += 1
+        changed = False
+        for row in range(0, n, block_rows):
+            block = np.maximum(closure[row:row + block_rows], squared[row:row + block_rows])
+            if not changed and np.any(block != closure[row:row + block_rows]):
+                changed = True
+            closure[row:row + block_rows] = block
+        if not changed:
+            return closure, compositions
+
+
+def power_matrix(M, k, block_elements=COMPOSITION_BLOCK, allocate=np.empty):
+    """
+    k-th max–min power of a square membership matrix by binary exponentiation,
+    O(log k) compositions. When the repeated square stops changing, every
+    higher power of it is the same, so the remaining bits cost one composition.
+    """
+    if k < 0:
+        raise ValueError("k must be non-negative")
+    n = len(M)
+    block_rows = max(1, block_elements // max(1, n))
+    result = allocate(M.shape, M.dtype)
+    if k == 0:
+        for row in range(0, n, block_rows):
+            result[row:row + block_rows] = 0
+            rows = np.arange(row, min(row + block_rows, n))
+            result[rows, rows] = 1
+        return result
+
+    base, spare = allocate(M.shape, M.dtype), allocate(M.shape, M.dtype)
+    _copy_blocks(M, base, block_rows)
+    have_result = False
+    while k:
+        if k & 1:
+            if have_result:
+                max_min_matrix(result, base, block_elements, out=spare)
+                result, spare = spare, result
+            else:
+                _copy_blocks(base, result, block_rows)
+                have_result = True
+        k >>= 1
+        if not k:
+            break
+        max_min_matrix(base, base, block_elements, out=spare)
+        if _equal_blocks(base, spare, block_rows):
+            # base is idempotent: base^j == base for every j >= 1
+            if not have_result:
+                return base
+            max_min_matrix(result, base, block_elements, out=spare)
+            return spare
+        base, spare = spare, base
+    return result
+
+
+def memmap_allocator(directory=None):
+    """allocate function for closure and powers that puts each matrix in a temporary file"""
+    def allocate(shape, dtype):
+        handle, path = tempfile.mkstemp(suffix=".npy", dir=directory)
+        os.close(handle)
+        array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        os.unlink(path)  # The mapping keeps the data; the file goes away with it (POSIX)
+        return array
+    return allocate
+
+
+def _copy_blocks(source, target, block_rows):
+    for row in range(0, len(source), block_rows):
+        target[row:row + block_rows] = source[row:row + block_rows]
+
+
+def _equal_blocks(A, B, block_rows):
+    return all(np.array_equal(A[row:row + block_rows], B[row:row + block_rows])
+               for row in range(0, len(A), block_rows))
+
+
+def _common_positions(source, target):
+    """Positions in source and in target of the labels they share"""
+    shared = [label for label in source.labels if label in target.index]
+    return source.positions(shared), target.positions(shared)
@@ -0,0 +1,411 @@
+import hashlib
+import math
+import os
+import sqlite3
+import warnings
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.metrics import mean_squared_error
+from sklearn.neural_network import MLPRegressor
+
+
+# Fitness function of main.ipynb as a picklable object, so it can run in worker processes
+# With a budget in (0, 1], training is cut down to that fraction of max_iter and, if subsample
+# is set, of the training rows too; this is the cheap fidelity used by successive halving
+class MLPFitness:
+    def __init__(self, X_train, y_train, X_test, y_test, subsample=False, **model_params):
+        self.X_train, self.y_train = X_train, y_train
+        self.X_test, self.y_test = X_test, y_test
+        self.subsample = subsample
+        self.model_params = dict(hidden_layer_sizes=(100, 50), activation='relu', solver='adam',
+                                 random_state=42)
+        self.model_params.update(model_params)
+
+    def __call__(self, params, budget=None):
+        """Test MSE of a freshly trained MLPRegressor (the GA parameters do not change the network)"""
+        model_params = dict(self.model_params)
+        X_train, y_train = self.X_train, self.y_train
+        if budget is not None and budget < 1:
+            model_params['max_iter'] = max(1, round(budget * model_params.get('max_iter', 200)))
+            if self.subsample:
+                n_rows = max(2, round(budget * len(X_train)))
+                X_train, y_train = X_train[:n_rows], y_train[:n_rows]
+
+        nn_model = MLPRegressor(**model_params)
+        with warnings.catch_warnings():
+            # Short budgets stop before convergence on purpose
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            nn_model.fit(X_train, y_train)
+        y_pred = nn_model.predict(self.X_test)
+        return mean_squared_error(self.y_test, y_pred)
+
+    def fingerprint(self):
+        """Hash of the data and model settings, so cached results are only reused for the same problem"""
+        digest = hashlib.sha256()
+        for array in (self.X_train, self.y_train, self.X_test, self.y_test):
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+        digest.update(repr((self.subsample, sorted(self.model_params.items()))).encode())
+        return digest.hexdigest()
+
+
+# Memoizes a fitness function on parameter tuples rounded to `decimals` places, so repeated
+# (population_size, crossover_rate, mutation_rate) triples are only trained once. The most
+# recently used max_size results stay in memory; with a path, every result is also written to
+# a sqlite file and survives restarts. namespace keeps different fitness functions apart in one file.
+# The key holds only the parameters, so a stored result is only valid for the data and model it was
+# computed on: by default the namespace is fitness_function.fingerprint() (see MLPFitness). A path
+# with a fitness function that has no fingerprint and no namespace tied to its data is unsafe,
+# because a later run on other data would read back the earlier run's results.
+class FitnessCache:
+    def __init__(self, fitness_function, decimals=3, max_size=10000, path=None, namespace=None):
+        self.fitness_function = fitness_function
+        self.decimals = decimals
+        self.max_size = max_size
+        if namespace is None:
+            fingerprint = getattr(fitness_function, 'fingerprint', None)
+            namespace = fingerprint() if fingerprint is not None else "default"
+        self.namespace = namespace
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path)
+            with self.connection:
+                self.connection.execute("CREATE TABLE IF NOT EXISTS fitness "
+                                        "(namespace TEXT, key TEXT, value REAL, PRIMARY KEY (namespace, key))")
+
+    def key(self, params, budget=None):
+        """Quantized parameter tuple, followed by the budget when there is one"""
+        key = tuple(round(float(p), self.decimals) for p in params)
+        return key if budget is None else key + (float(budget),)
+
+    def __call__(self, params, budget=None):
+        fitness = self.lookup(params, budget)
+        if fitness is None:
+            fitness = (self.fitness_function(params) if budget is None
+                       else self.fitness_function(params, budget))
+            self.store(params, fitness, budget)
+        return fitness
+
+    def lookup(self, params, budget=None):
+        """Cached fitness of params, or None (counted as a miss)"""
+        key = self.key(params, budget)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        if self.connection is not None:
+            row = self.connection.execute("SELECT value FROM fitness WHERE namespace = ? AND key = ?",
+                                          (self.namespace, repr(key))).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                self.disk_hits += 1
+                return row[0]
+        self.misses += 1
+        return None
+
+    def store(self, params, fitness, budget=None):
+        key = self.key(params, budget)
+        self._remember(key, fitness)
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO fitness VALUES (?, ?, ?)",
+                                        (self.namespace, repr(key), float(fitness)))
+
+    def _remember(self, key, fitness):
+        self.memory[key] = fitness
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)  # Least recently used
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate}
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# Define a GeneticAlgorithm class with an optimize method
+class GeneticAlgorithm:
+    def __init__(self, fitness_function=None, parameter_ranges=None, population_size=50, crossover_rate=0.8, mutation_rate=0.05, generations=20,
+                 rungs=None, keep_fraction=1/3, integer_parameters=('population_size',)):
+        # If initialized with parameter values (for use in fitness function)
+        self.population_size = population_size
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = mutation_rate
+
+        # If initialized for optimization
+        self.fitness_function = fitness_function
+        self.parameter_ranges = parameter_ranges
+        self.integer_parameters = integer_parameters
+        self.generations = generations
+
+        # Multi-fidelity evaluation: successive halving over the budgets in rungs (fractions of a
+        # full training, the last one 1), keeping the best keep_fraction at each step.
+        # fitness_function is then called as fitness_function(params, budget)
+        self.rungs = rungs
+        self.keep_fraction = keep_fraction
+        self.budget_spent = 0.0  # In full trainings
+
+        # Steady-state state used by ask/tell
+        self.population = None
+        self.fitness_scores = np.empty(0)
+        self.best_individual = None
+        self.best_fitness = float('inf')  # We're minimizing MSE
+        self.evaluations = 0
+
+    # Populations are structured arrays with one field per parameter (int64 for the integer
+    # parameters, float64 otherwise), so every operator works on whole columns at once.
+    # Individuals are handed out as dicts by optimize(), optimize_async() and ask().
+
+    def optimize(self):
+        """Optimize parameters using genetic algorithm"""
+        # Initialize population randomly within parameter ranges
+        population = self._random_population(self.population_size)
+
+        best_individual = None
+        best_fitness = float('inf')  # We're minimizing MSE
+
+        # Run for specified number of generations
+        for generation in range(self.generations):
+            # Evaluate fitness for each individual
+            budget_spent = self.budget_spent
+            fitness_scores, full_fitness = self._evaluate_population(population)
+
+            # Track best individual (only full-budget results count)
+            best = np.argmin(full_fitness)
+            if full_fitness[best] < best_fitness:
+                best_fitness = full_fitness[best]
+                best_individual = population[best].copy()
+
+            # Print progress
+            print(f"Generation {generation+1}/{self.generations}, Best MSE: {best_fitness:.6f}, "
+                  f"training budget: {self.budget_spent - budget_spent:.1f} full trainings")
+
+            # Create new population
+            new_population = np.empty_like(population)
+            # Elitism: Keep the best individual
+            new_population[0] = best_individual
+
+            # Tournament selection, crossover and mutation for the rest
+            new_population[1:] = self._breed(population, fitness_scores, self.population_size - 1)
+
+            # Update population
+            population = new_population
+
+        return self._as_dict(best_individual)
+
+    def _evaluate_population(self, population):
+        """
+        Return (selection scores, full-budget fitness) arrays for the population.
+
+        Without rungs both are the plain fitness values. With rungs, every
+        individual is trained on the first budget, the best keep_fraction of
+        those go on to the next budget, and so on; only the ones that reach the
+        last rung get a full-budget fitness (inf for the others). Selection
+        scores are ranks: individuals that got further come first, ordered by
+        their fitness on the last budget they reached.
+        """
+        params = [self._params(individual) for individual in population]
+        if self.rungs is None:
+            fitness = np.array([self.fitness_function(p) for p in params])
+            self.budget_spent += len(population)
+            return fitness, fitness
+
+        candidates = np.arange(len(population))
+        scores = np.empty(len(population))
+        reached = np.zeros(len(population), dtype=int)
+        for rung, budget in enumerate(self.rungs):
+            scores[candidates] = [self.fitness_function(params[i], budget) for i in candidates]
+            reached[candidates] = rung
+            self.budget_spent += budget * len(candidates)
+            if rung < len(self.rungs) - 1:
+                keep = max(1, math.ceil(len(candidates) * self.keep_fraction))
+                candidates = candidates[np.argsort(scores[candidates], kind='stable')[:keep]]
+
+        ranks = np.empty(len(population))
+        ranks[np.lexsort((scores, -reached))] = np.arange(len(population))
+        full_fitness = np.where(reached == len(self.rungs) - 1, scores, np.inf)
+        return ranks, full_fitness
+
+    def ask(self):
+        """Return a new individual to evaluate: random until the population is full, then bred from it"""
+        if len(self.fitness_scores) < self.population_size:
+            return self._as_dict(self._random_population(1)[0])
+        return self._as_dict(self._breed(self.population, self.fitness_scores, 1)[0])
+
+    def tell(self, individual, fitness):
+        """Report the fitness of an individual returned by ask"""
+        self.evaluations += 1
+        if fitness < self.best_fitness:
+            self.best_fitness = fitness
+            self.best_individual = dict(individual)
+
+        record = np.array([tuple(individual[param] for param in self.parameter_ranges)], dtype=self._dtype())
+        if len(self.fitness_scores) < self.population_size:
+            self.population = record if self.population is None else np.concatenate((self.population, record))
+            self.fitness_scores = np.append(self.fitness_scores, fitness)
+            return
+        # Steady-state replacement: the child takes the place of the worst individual if it is better
+        worst = int(np.argmax(self.fitness_scores))
+        if fitness < self.fitness_scores[worst]:
+            self.population[worst] = record[0]
+            self.fitness_scores[worst] = fitness
+
+    def optimize_async(self, n_workers=None, max_evaluations=None):
+        """
+        Asynchronous steady-state GA: n_workers evaluations are always running in a
+        process pool, and a new child is bred as soon as one of them finishes, so no
+        worker waits for the slowest evaluation of a generation.
+
+        By default the budget is population_size * generations evaluations, as in optimize().
+        fitness_function must be picklable (e.g. MLPFitness); it is sent once to each worker.
+        Every evaluation uses the full budget; rungs only apply to optimize().
+        A FitnessCache is consulted here, before submitting, and only its wrapped
+        function goes to the workers.
+        """
+        n_workers = n_workers or os.cpu_count()
+        if max_evaluations is None:
+            max_evaluations = self.population_size * self.generations
+
+        cache = self.fitness_function if isinstance(self.fitness_function, FitnessCache) else None
+        fitness_function = cache.fitness_function if cache is not None else self.fitness_function
+
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_set_worker_fitness,
+                                 initargs=(fitness_function,)) as pool:
+            running = {}
+            submitted = 0
+            while running or submitted < max_evaluations:
+                # Keep every worker busy
+                while len(running) < n_workers and submitted < max_evaluations:
+                    individual = self.ask()
+                    submitted += 1
+                    fitness = cache.lookup(self._params(individual)) if cache is not None else None
+                    if fitness is not None:
+                        self._tell_and_report(individual, fitness, max_evaluations)
+                    else:
+                        running[pool.submit(_evaluate_worker, self._params(individual))] = individual
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    individual = running.pop(future)
+                    if cache is not None:
+                        cache.store(self._params(individual), future.result())
+                    self._tell_and_report(individual, future.result(), max_evaluations)
+
+        return self.best_individual
+
+    def _tell_and_report(self, individual, fitness, max_evaluations):
+        self.tell(individual, fitness)
+        # Print progress once per population_size evaluations
+        if self.evaluations % self.population_size == 0:
+            print(f"Evaluations {self.evaluations}/{max_evaluations}, Best MSE: {self.best_fitness:.6f}")
+
+    def _dtype(self):
+        return np.dtype([(param, np.int64 if param in self.integer_parameters else np.float64)
+                         for param in self.parameter_ranges])
+
+    def _as_dict(self, individual):
+        return {param: individual[param].item() for param in self.parameter_ranges}
+
+    def _random_population(self, n):
+        """Draw n individuals uniformly within the parameter ranges, one call per parameter"""
+        population = np.empty(n, dtype=self._dtype())
+        for param, (min_val, max_val) in self.parameter_ranges.items():
+            if param in self.integer_parameters:
+                # For integer parameters
+                population[param] = np.random.randint(min_val, max_val + 1, size=n)
+            else:
+                # For float parameters
+                population[param] = np.random.uniform(min_val, max_val, size=n)
+        return population
+
+    def _params(self, individual):
+        """Parameter tuple passed to the fitness function"""
+        return (individual['population_size'],
+                individual['crossover_rate'],
+                individual['mutation_rate'])
+
+    def _breed(self, population, fitness_scores, n):
+        """Create n children by tournament selection, crossover and mutation"""
+        # Tournament selection
+        parents1 = population[self._tournament_selection(fitness_scores, n)]
+        parents2 = population[self._tournament_selection(fitness_scores, n)]
+
+        # Crossover
+        children = self._crossover(parents1, parents2)
+
+        # Mutation
+        return self._mutation(children)
+
+    def _tournament_selection(self, fitness_scores, n, tournament_size=3):
+        """Indices of the winners of n tournaments, each between distinct individuals"""
+        fitness_scores = np.asarray(fitness_scores)
+        contestants = np.empty((n, tournament_size), dtype=np.int64)
+        for j in range(tournament_size):
+            # Uniform over the individuals not yet in the tournament: draw a rank among the
+            # remaining ones and step over the taken indices in increasing order
+            draw = np.random.randint(0, len(fitness_scores) - j, size=n)
+            for taken in np.sort(contestants[:, :j], axis=1).T:
+                draw += draw >= taken
+            contestants[:, j] = draw
+        best = np.argmin(fitness_scores[contestants], axis=1)  # Minimize MSE
+        return contestants[np.arange(n), best]
+
+    def _crossover(self, parents1, parents2):
+        """Perform crossover between pairs of parents (children of parents1 if not crossed)"""
+        children = parents1.copy()
+        crossed = np.random.random(len(children)) < self.crossover_rate
+        for param in self.parameter_ranges:
+            # 50% chance of inheriting from each parent
+            from_parent2 = crossed & (np.random.random(len(children)) < 0.5)
+            children[param][from_parent2] = parents2[param][from_parent2]
+        return children
+
+    def _mutation(self, population):
+        """Apply mutation to every individual, in place"""
+        for param, (min_val, max_val) in self.parameter_ranges.items():
+            # Apply mutation with probability self.mutation_rate
+            mutated = np.flatnonzero(np.random.random(len(population)) < self.mutation_rate)
+            column = population[param]
+            if param in self.integer_parameters:
+                # For integer parameters
+                column[mutated] = np.random.randint(min_val, max_val + 1, size=len(mutated))
+            else:
+                # For float parameters, small perturbation
+                delta = (max_val - min_val) * 0.1  # 10% of range
+                column[mutated] += np.random.uniform(-delta, delta, size=len(mutated))
+                # Keep within bounds
+                column[mutated] = np.clip(column[mutated], min_val, max_val)
+        return population
+
+
+# Worker-process side of optimize_async: the fitness function is installed once per worker
+_worker_fitness = None
+
+
+def _set_worker_fitness(fitness_function):
+    global _worker_fitness
+    _worker_fitness = fitness_function
+
+
+def _evaluate_worker(params):
+    return _worker_fitness(params)
@@ -1,16 +1,80 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 
 # Objective function (minimize distance from 3)
+# Works on one antibody or, row by row, on a whole (n, dim) block
 def objective_function(x):
-    return np.sum((x - 3)**2)
+    return np.sum((x - 3)**2, axis=-1)
+
+# Pluggable fitness evaluation
+# "rowwise" calls the objective once per antibody, "vectorized" once with the whole
+# (n, dim) block, "thread" and "process" spread chunks of rows over a worker pool.
+# Results come back in row order, so they do not depend on the number of workers.
+class Evaluator:
+    def __init__(self, objective=objective_function, mode="rowwise", workers=None, chunk_size=None):
+        if mode not in ("rowwise", "vectorized", "thread", "process"):
+            raise ValueError(f"Unknown evaluation mode: {mode!r}")
+        self.objective = objective
+        self.mode = mode
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.pool = None
+        # Pools are created once and reused by every generation
+        if mode == "thread":
+            self.pool = ThreadPoolExecutor(self.workers)
+        elif mode == "process":
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_set_worker_objective,
+                                            initargs=(objective,))
+
+    def __call__(self, population):
+        if self.mode == "rowwise":
+            return _evaluate_rows(self.objective, population)
+        if self.mode == "vectorized":
+            return np.asarray(self.objective(population), dtype=float).reshape(len(population))
+
+        chunk_size = self.chunk_size or max(1, -(-len(population) // (4 * self.workers)))
+        chunks = [population[i:i + chunk_size] for i in range(0, len(population), chunk_size)]
+        if self.mode == "thread":
+            results = self.pool.map(_evaluate_rows, [self.objective] * len(chunks), chunks)
+        else:
+            results = self.pool.map(_evaluate_worker_chunk, chunks)
+        return np.concatenate(list(results)) if chunks else np.empty(0)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _evaluate_rows(objective, rows):
+    return np.array([objective(row) for row in rows], dtype=float)
+
+# Process workers receive the objective once, at start-up
+_worker_objective = None
+
+def _set_worker_objective(objective):
+    global _worker_objective
+    _worker_objective = objective
+
+def _evaluate_worker_chunk(rows):
+    return _evaluate_rows(_worker_objective, rows)
 
 # 1. Initialize population (0-10 only)
 def initialize_population(pop_size, dim):
     return np.random.uniform(0, 10, (pop_size, dim))
 
 # 2. Calculate fitness
-def calculate_fitness(population):
-    return np.apply_along_axis(objective_function, 1, population)
+def calculate_fitness(population, evaluator=None):
+    if evaluator is None:
+        return np.apply_along_axis(objective_function, 1, population)
+    return evaluator(population)
 
 # 3. Select top antibodies
 def select_antibodies(population, fitness, num_selected):
@@ -28,23 +92,24 @@ def mutate_clones(clones, mutation_rate):
     return np.clip(mutated, 0, 10)  # Ensure 0-10 range
 
 # 6. Select next generation
-def select_next_generation(population, clones, pop_size):
+# The parents' fitness is already known, so only the (all mutated) clones are evaluated
+def select_next_generation(population, clones, pop_size, fitness, evaluator=None):
     combined = np.vstack((population, clones))
-    combined_fitness = calculate_fitness(combined)
+    combined_fitness = np.concatenate((fitness, calculate_fitness(clones, evaluator)))
     best_indices = np.argsort(combined_fitness)[:pop_size]
-    return combined[best_indices]
+    return combined[best_indices], combined_fitness[best_indices]
 
 # Main algorithm
-def clonal_selection(pop_size=50, num_gen=50, dim=5, clone_factor=5, mutation_rate=0.2):
+def clonal_selection(pop_size=50, num_gen=50, dim=5, clone_factor=5, mutation_rate=0.2, evaluator=None):
     # Initialize
     pop = initialize_population(pop_size, dim)
     best_sol = None
     best_fit = float('inf')
     
+    # Evaluate once; afterwards fitness is carried forward with the survivors
+    fitness = calculate_fitness(pop, evaluator)
+    
     for _ in range(num_gen):
-        # Evaluate
-        fitness = calculate_fitness(pop)
-        
         # Track best
         if fitness[0] < best_fit:
             best_sol = pop[0].copy()
@@ -60,13 +125,85 @@ def clonal_selection(pop_size=50, num_gen=50, dim=5, clone_factor=5, mutation_ra
         clones = mutate_clones(clones, mutation_rate)
         
         # Next generation
-        pop = select_next_generation(pop, clones, pop_size)
-        print(f'Best fitness in generation {_}: {best_fit}')
+        pop, fitness = select_next_generation(pop, clones, pop_size, fitness, evaluator)
+        # Re-scoring the population and the parents would cost 2 * pop_size more evaluations
+        print(f'Best fitness in generation {_}: {best_fit} '
+              f'(evaluations: {len(clones)}, saved: {2 * pop_size})')
 
     
     return best_sol, best_fit
 
+# Batched multi-restart: R independent runs evolved together as an (R, pop_size, dim) tensor
+# Every run draws from its own RNG stream (seeded by seeds[r]) and may have its own mutation
+# rate; pop_size, dim and clone_factor are shared so the runs stack into one array.
+# Returns a per-run table (run, seed, mutation_rate, best_fitness), the best solutions
+# (R, dim) and the best-so-far fitness after every generation (R, num_gen).
+def clonal_selection_batch(n_runs=None, pop_size=50, num_gen=50, dim=5, clone_factor=5,
+                           mutation_rate=0.2, seeds=None, evaluator=None):
+    if n_runs is None:
+        n_runs = len(seeds) if seeds is not None else np.size(mutation_rate)
+    if seeds is None:
+        seeds = np.random.SeedSequence().generate_state(n_runs)
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    mutation_rates = np.broadcast_to(np.asarray(mutation_rate, dtype=float), (n_runs,))
+    rngs = [np.random.default_rng(int(seed)) for seed in seeds]
+    runs = np.arange(n_runs)[:, None]
+    num_selected = pop_size // 2
+
+    # Initialize (0-10 only) and evaluate once, as one (R * pop_size, dim) block
+    pop = np.stack([rng.uniform(0, 10, (pop_size, dim)) for rng in rngs])
+    fitness = calculate_fitness(pop.reshape(-1, dim), evaluator).reshape(n_runs, pop_size)
+    best_fit = np.full(n_runs, np.inf)
+    best_sol = np.zeros((n_runs, dim))
+    curves = np.empty((n_runs, num_gen))
+
+    for gen in range(num_gen):
+        # Track best of every run
+        current = np.argmin(fitness, axis=1)
+        improved = fitness[runs[:, 0], current] < best_fit
+        best_fit[improved] = fitness[improved, current[improved]]
+        best_sol[improved] = pop[improved, current[improved]]
+        curves[:, gen] = best_fit
+
+        # Selection and cloning, along the run axis
+        selected_idx = np.argpartition(fitness, num_selected - 1, axis=1)[:, :num_selected]
+        clones = np.repeat(pop[runs, selected_idx], clone_factor, axis=1)
+
+        # Mutation (with 0-10 bounds); each run's noise comes from its own stream
+        noise = np.stack([rng.random(clones.shape[1:]) for rng in rngs])
+        clones += (2.0 * noise - 1.0) * mutation_rates[:, None, None]
+        np.clip(clones, 0, 10, out=clones)
+
+        # Next generation: parents keep their fitness, only clones are evaluated
+        clone_fitness = calculate_fitness(clones.reshape(-1, dim), evaluator).reshape(n_runs, -1)
+        combined = np.concatenate((pop, clones), axis=1)
+        combined_fitness = np.concatenate((fitness, clone_fitness), axis=1)
+        best_indices = np.argsort(combined_fitness, axis=1)[:, :pop_size]
+        pop = combined[runs, best_indices]
+        fitness = combined_fitness[runs, best_indices]
+
+    table = np.zeros(n_runs, dtype=[('run', int), ('seed', np.uint64),
+                                     ('mutation_rate', float), ('best_fitness', float)])
+    table['run'] = np.arange(n_runs)
+    table['seed'] = seeds
+    table['mutation_rate'] = mutation_rates
+    table['best_fitness'] = best_fit
+    return table, best_sol, curves
+
+def print_run_table(table):
+    print(f"{'run':>4} {'seed':>12} {'mutation_rate':>14} {'best_fitness':>14}")
+    for row in table:
+        print(f"{row['run']:>4} {row['seed']:>12} {row['mutation_rate']:>14.4f} {row['best_fitness']:>14.6g}")
+
 # Run and print results
-solution, fitness = clonal_selection()
-print('Best Solution:', solution)
-print('Fitness:', fitness)
+# The guard keeps process-pool workers from re-running the example when they import this file
+if __name__ == "__main__":
+    with Evaluator(mode="vectorized") as evaluator:
+        solution, fitness = clonal_selection(evaluator=evaluator)
+    print('Best Solution:', solution)
+    print('Fitness:', fitness)
+
+    # Sweep: 8 seeds for each of three mutation rates, evolved in one batch
+    table, _, _ = clonal_selection_batch(mutation_rate=np.repeat([0.1, 0.2, 0.5], 8),
+                                         seeds=np.arange(24), evaluator=Evaluator(mode="vectorized"))
+    print_run_table(table)
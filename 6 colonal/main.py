@@ -1,30 +1,27 @@
-import random
 import numpy as np
 
+# The population is a single (population_size, solution_size) array, one antibody per row,
+# with a matching affinity array that travels with it so no antibody is scored twice.
+# Functions that take an `out` argument write into a buffer that the main loop reuses.
+
 # Function to initialize the population of antibodies (solutions)
 def initialize_population(population_size, solution_size):
-    # Randomly initialize antibodies (solutions)
-    population = []
-    for _ in range(population_size):
-        antibody = np.random.uniform(low=-10, high=10, size=solution_size)  # solutions in range [-10, 10]
-        population.append(antibody)
-    return population
-
-# Function to calculate the affinity of an antibody based on a fitness function
-def calculate_affinity(population):
-    affinities = []
-    for antibody in population:
-        # Example fitness function: sum of squares of the solution values (to minimize)
-        fitness = np.sum(antibody ** 2)
-        affinity = 1 / (1 + fitness)  # Higher fitness -> higher affinity
-        affinities.append(affinity)
-    return affinities
-
-# Patched function: select antibodies for cloning based on affinity
-def select_antibodies_for_cloning(population, affinities):
+    # Randomly initialize antibodies (solutions) in range [-10, 10]
+    return np.random.uniform(low=-10, high=10, size=(population_size, solution_size))
+
+# Function to calculate the affinity of every antibody based on a fitness function
+def calculate_affinity(population, out=None):
+    # Example fitness function: sum of squares of the solution values (to minimize), row by row
+    affinities = np.einsum('ij,ij->i', population, population, out=out)
+    # Higher fitness -> higher affinity: 1 / (1 + fitness)
+    affinities += 1.0
+    return np.reciprocal(affinities, out=affinities)
+
+# Function to select antibodies for cloning based on affinity
+# Returns the selected antibodies and their (already known) affinities
+def select_antibodies_for_cloning(population, affinities, out=None, out_affinities=None):
     # Normalize affinities into probabilities
-    total_affinity = sum(affinities)
-    probabilities = [aff / total_affinity for aff in affinities]
+    probabilities = affinities / affinities.sum()
 
     # Sample indices according to those probabilities
     idxs = np.random.choice(
@@ -34,35 +31,46 @@ def select_antibodies_for_cloning(population, affinities):
         replace=True
     )
 
-    # Return the corresponding antibodies
-    return [population[i] for i in idxs]
+    # Gather the corresponding antibodies and their affinities
+    selected = np.take(population, idxs, axis=0, out=out)
+    return selected, np.take(affinities, idxs, out=out_affinities)
 
-# Function to clone selected antibodies (just copy them)
+# Function to clone selected antibodies (the gathered rows are already copies)
 def clone_antibodies(selected_antibodies):
-    return selected_antibodies.copy()
-
-# Function to mutate antibodies (introduce diversity)
-def mutate_antibodies(cloned_antibodies, mutation_rate):
-    mutated_antibodies = []
-    for antibody in cloned_antibodies:
-        # Mutate with a random small value if mutation rate is met
-        if random.random() < mutation_rate:
-            mutation = np.random.uniform(low=-1, high=1, size=antibody.shape)
-            antibody = antibody + mutation  # Add mutation to the antibody
-        mutated_antibodies.append(antibody)
-    return mutated_antibodies
+    return selected_antibodies
+
+# Function to mutate antibodies in place (introduce diversity)
+# Only the mutated antibodies are re-scored; the others keep the affinity they were cloned with
+# Returns the antibodies and the number of affinity evaluations spent
+def mutate_antibodies(cloned_antibodies, mutation_rate, affinities):
+    # Each antibody mutates with probability mutation_rate
+    mutate = np.random.random(len(cloned_antibodies)) < mutation_rate
+    n_mutated = np.count_nonzero(mutate)
+    if n_mutated:
+        # Add a random small value to every mutated antibody
+        cloned_antibodies[mutate] += np.random.uniform(low=-1, high=1,
+                                                       size=(n_mutated, cloned_antibodies.shape[1]))
+        affinities[mutate] = calculate_affinity(cloned_antibodies[mutate])
+    return cloned_antibodies, n_mutated
 
 # Function to select the next generation of antibodies based on affinity
-def select_next_generation(population, mutated_antibodies, affinities):
-    # Combine original and mutated antibodies
-    combined_population = population + mutated_antibodies
-    # Calculate new affinities for the combined population
-    combined_affinities = calculate_affinity(combined_population)
-
-    # Sort antibodies by affinity (select top half)
-    sorted_indices = np.argsort(combined_affinities)[::-1]  # Sort descending by affinity
-    next_generation = [combined_population[i] for i in sorted_indices[:len(population)]]
-    return next_generation
+# Both populations come with known affinities, so nothing is recalculated here
+def select_next_generation(population, mutated_antibodies, affinities, mutated_affinities,
+                           combined=None, combined_affinities=None):
+    size = len(population)
+    # Combine original and mutated antibodies, and their affinities
+    if combined is None:
+        combined = np.empty((2 * size, population.shape[1]))
+        combined_affinities = np.empty(2 * size)
+    combined[:size] = population
+    combined[size:] = mutated_antibodies
+    combined_affinities[:size] = affinities
+    combined_affinities[size:] = mutated_affinities
+
+    # Keep the top half by affinity; the order within it does not matter, so no full sort
+    best_indices = np.argpartition(-combined_affinities, size - 1)[:size]
+    np.take(combined_affinities, best_indices, out=affinities)
+    return np.take(combined, best_indices, axis=0, out=population)
 
 # Function to get the best antibody in the population
 def best_antibody(population, affinities):
@@ -70,29 +78,44 @@ def best_antibody(population, affinities):
     return population[best_index]
 
 # Main function to execute the Clonal Selection Algorithm
-def clonal_selection_algorithm(population_size, solution_size, mutation_rate, num_iterations):
+# If evaluation_log is a list, one (evaluations, evaluations_saved) pair is appended per generation,
+# counted against re-scoring the population and the combined population every generation
+def clonal_selection_algorithm(population_size, solution_size, mutation_rate, num_iterations,
+                               evaluation_log=None):
     # Initialize population of antibodies (solutions)
     antibodies = initialize_population(population_size, solution_size)
 
-    for _ in range(num_iterations):
-        # Calculate affinity of antibodies
-        affinities = calculate_affinity(antibodies)
+    # Buffers allocated once and reused by every generation
+    affinities = np.empty(population_size)
+    clones = np.empty_like(antibodies)
+    clone_affinities = np.empty(population_size)
+    combined = np.empty((2 * population_size, solution_size))
+    combined_affinities = np.empty(2 * population_size)
 
+    # Calculate affinity of the initial antibodies; afterwards affinities are carried forward
+    calculate_affinity(antibodies, out=affinities)
+
+    for _ in range(num_iterations):
         # Select antibodies for cloning
-        selected_antibodies = select_antibodies_for_cloning(antibodies, affinities)
+        selected_antibodies, _ = select_antibodies_for_cloning(antibodies, affinities, out=clones,
+                                                               out_affinities=clone_affinities)
 
         # Clone selected antibodies
         cloned_antibodies = clone_antibodies(selected_antibodies)
 
         # Mutate cloned antibodies
-        mutated_antibodies = mutate_antibodies(cloned_antibodies, mutation_rate)
+        mutated_antibodies, evaluations = mutate_antibodies(cloned_antibodies, mutation_rate,
+                                                            clone_affinities)
+        if evaluation_log is not None:
+            evaluation_log.append((evaluations, 3 * population_size - evaluations))
 
         # Select antibodies for the next generation
-        antibodies = select_next_generation(antibodies, mutated_antibodies, affinities)
+        antibodies = select_next_generation(antibodies, mutated_antibodies, affinities, clone_affinities,
+                                            combined, combined_affinities)
 
     # Return best antibody (solution)
-    best = best_antibody(antibodies, calculate_affinity(antibodies))
-    return best
+    best = best_antibody(antibodies, affinities)
+    return best.copy()
 
 # Example usage
 if __name__ == "__main__":
@@ -102,7 +125,12 @@ if __name__ == "__main__":
     num_iterations = 100    # Number of iterations (generations)
 
     # Run Clonal Selection Algorithm
+    evaluation_log = []
     best_solution = clonal_selection_algorithm(
-        population_size, solution_size, mutation_rate, num_iterations
+        population_size, solution_size, mutation_rate, num_iterations, evaluation_log
     )
     print("Best solution:", best_solution)
+    evaluations = sum(evaluated for evaluated, _ in evaluation_log)
+    saved = sum(saved for _, saved in evaluation_log)
+    print(f"Affinity evaluations: {evaluations} (saved {saved}, "
+          f"{saved / len(evaluation_log):.1f} per generation)")
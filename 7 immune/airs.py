@@ -0,0 +1,434 @@
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+# Saved model files: MAGIC, a little-endian uint32 header length, a JSON header and then the
+# arrays, each starting at a multiple of ALIGNMENT so they can be memory-mapped directly.
+# Files whose header has another format_version are rejected by load_model.
+MAGIC = b"\x93AIRS\x00\x00\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+# Nearest cell (by Euclidean distance) of every row of X, processed block_size rows at a time so
+# the temporary (block_size, cells) distance matrix stays bounded
+# float32 cells (e.g. from a saved model) are searched in float32
+# Returns the indices of the nearest cells and the distances to them
+def nearest_cells(cells, X, block_size=1024):
+    X = np.asarray(X, dtype=np.result_type(cells.dtype, np.float32))
+    cell_norms = np.einsum('ij,ij->i', cells, cells)
+    indices = np.empty(len(X), dtype=np.int64)
+    distances = np.empty(len(X))
+    for start in range(0, len(X), block_size):
+        block = X[start:start + block_size]
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2; |x|^2 does not change the argmin
+        squared = cell_norms - 2.0 * block @ cells.T
+        nearest = np.argmin(squared, axis=1)
+        rows = np.arange(len(block))
+        indices[start:start + len(block)] = nearest
+        squared = squared[rows, nearest] + np.einsum('ij,ij->i', block, block)
+        distances[start:start + len(block)] = np.sqrt(np.maximum(squared, 0.0))
+    return indices, distances
+
+
+# Nearest-cell index over a fixed set of cells, answering the same queries as nearest_cells
+# - "brute": the blocked exhaustive scan
+# - "kdtree": scipy's cKDTree, exact; best for low-dimensional features
+# - "ivf": approximate; the cells are split into n_partitions k-means partitions and a query only
+#   scans the cells of its n_probe nearest partitions. More probes give higher recall (n_probe =
+#   n_partitions is exact) at proportionally higher cost
+class CellIndex:
+    def __init__(self, cells, method="kdtree", n_partitions=None, n_probe=4, kmeans_iterations=10,
+                 block_size=1024):
+        self.cells = np.asarray(cells, dtype=float)
+        self.method = method
+        self.block_size = block_size
+        if method == "kdtree":
+            from scipy.spatial import cKDTree
+            self.tree = cKDTree(self.cells)
+        elif method == "ivf":
+            self._build_partitions(n_partitions or max(1, int(np.sqrt(len(self.cells)))), kmeans_iterations)
+            self.n_probe = min(n_probe, len(self.centroids))
+        elif method != "brute":
+            raise ValueError(f"Unknown index method: {method}")
+
+    def _build_partitions(self, n_partitions, kmeans_iterations):
+        # Lloyd's k-means on the cells, started from a random subset of them
+        n_partitions = min(n_partitions, len(self.cells))
+        centroids = self.cells[np.random.choice(len(self.cells), n_partitions, replace=False)]
+        for _ in range(kmeans_iterations):
+            assignment, _ = nearest_cells(centroids, self.cells, self.block_size)
+            counts = np.bincount(assignment, minlength=n_partitions)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, self.cells)
+            filled = counts > 0  # Empty partitions keep their old centroid
+            centroids[filled] = sums[filled] / counts[filled, None]
+        assignment, _ = nearest_cells(centroids, self.cells, self.block_size)
+
+        # Cells sorted by partition; partition p holds order[offsets[p]:offsets[p + 1]]
+        self.centroids = centroids
+        self.order = np.argsort(assignment, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=n_partitions))))
+
+    def query(self, X):
+        """Indices of the nearest cells of the rows of X and the distances to them"""
+        X = np.asarray(X, dtype=float)
+        if self.method == "brute":
+            return nearest_cells(self.cells, X, self.block_size)
+        if self.method == "kdtree":
+            distances, indices = self.tree.query(X)
+            return indices, distances
+
+        # Partitions probed by every query
+        _, probes = self._nearest_centroids(X)
+        indices = np.zeros(len(X), dtype=np.int64)
+        distances = np.full(len(X), np.inf)
+        # Scan one partition at a time, against all the queries that probe it
+        for partition in range(len(self.centroids)):
+            queries = np.flatnonzero((probes == partition).any(axis=1))
+            members = self.order[self.offsets[partition]:self.offsets[partition + 1]]
+            if len(queries) == 0 or len(members) == 0:
+                continue
+            nearest, nearest_distances = nearest_cells(self.cells[members], X[queries], self.block_size)
+            closer = nearest_distances < distances[queries]
+            indices[queries[closer]] = members[nearest[closer]]
+            distances[queries[closer]] = nearest_distances[closer]
+        return indices, distances
+
+    def _nearest_centroids(self, X):
+        centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        squared = centroid_norms - 2.0 * X @ self.centroids.T
+        if self.n_probe >= len(self.centroids):
+            return squared, np.broadcast_to(np.arange(len(self.centroids)), squared.shape)
+        return squared, np.argpartition(squared, self.n_probe - 1, axis=1)[:, :self.n_probe]
+
+
+# (X, y) batches of batch_size rows; with np.load(..., mmap_mode='r') arrays only one batch
+# is read into memory at a time
+def iter_batches(X, y, batch_size=1024):
+    for start in range(0, len(X), batch_size):
+        yield X[start:start + batch_size], y[start:start + batch_size]
+
+
+# AIRS-like model
+# index: None for the exhaustive scan, or a CellIndex method ("kdtree", "ivf") built after
+# training, with index_options passed on to CellIndex
+class SimpleAIRS:
+    def __init__(self, num_detectors=20, block_size=1024, index=None, index_options=None):
+        self.num_detectors = num_detectors
+        self.block_size = block_size
+        self.index = index
+        self.index_options = index_options or {}
+        self.cell_index = None
+
+    def train(self, X, y):
+        # Randomly select some samples as detectors
+        idxs = np.random.choice(len(X), self.num_detectors, replace=False)
+        self.detectors = np.array(X[idxs], dtype=float)
+        self.detector_labels = np.asarray(y)[idxs]
+        self.build_index()
+
+    def build_index(self, index=None, **index_options):
+        """(Re)build the nearest-detector index; without arguments the configured one"""
+        if index is not None:
+            self.index, self.index_options = index, index_options
+        self.cell_index = None
+        if self.index is not None:
+            self.cell_index = CellIndex(self.detectors, self.index, block_size=self.block_size,
+                                        **self.index_options)
+
+    def predict(self, X):
+        if self.cell_index is None and self.index is not None:
+            self.build_index()
+        if self.cell_index is not None:
+            nearest, _ = self.cell_index.query(X)
+        else:
+            nearest, _ = nearest_cells(self.detectors, X, self.block_size)
+        return self.detector_labels[nearest]
+
+
+# Clonal selection classifier; the memory cells are a (cells, features) matrix with a label
+# vector, so BMU search, cloning and clone scoring are batched over all antigens
+# index / index_options work as for SimpleAIRS; the index is only used by predict
+# max_cells bounds the memory kept by partial_fit
+class ArtificialImmuneClassifier:
+    def __init__(self, n_detectors=20, n_clones=5, mutation_rate=0.05, n_generations=10, block_size=1024,
+                 index=None, index_options=None, max_cells=10000):
+        self.n_detectors = n_detectors
+        self.n_clones = n_clones
+        self.mutation_rate = mutation_rate
+        self.n_generations = n_generations
+        self.block_size = block_size
+        self.index = index
+        self.index_options = index_options or {}
+        self.max_cells = max_cells
+        self.cells = None
+        self.labels = None
+        self.cell_index = None
+
+        # Streaming state: the batch in which each cell was last the BMU or created
+        self.last_used = None
+        self.n_batches_seen = 0
+        self.n_samples_seen = 0
+
+    @property
+    def memory_cells(self):
+        """The memory cells as a list of {'vector', 'label'} dicts"""
+        if self.cells is None:
+            return []
+        return [{'vector': vector, 'label': label} for vector, label in zip(self.cells, self.labels)]
+
+    def _affinity(self, v1, v2):
+        return -np.linalg.norm(v1 - v2)
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        # Initialize memory cells with random detectors
+        idxs = np.random.choice(len(X), self.n_detectors, replace=False)
+        self.cells, self.labels = X[idxs].copy(), y[idxs]
+
+        for _ in range(self.n_generations):
+            # Every antigen sees the memory of the previous generation, so the whole pass is one batch
+            new_cells = np.empty_like(X)
+            new_labels = np.empty_like(y, shape=len(y))
+            for start in range(0, len(X), self.block_size):
+                stop = start + self.block_size
+                new_cells[start:stop], new_labels[start:stop] = self._select(X[start:stop], y[start:stop])
+            self.cells, self.labels = new_cells, new_labels
+        self.last_used = np.zeros(len(self.cells), dtype=np.int64)
+        self.build_index()
+
+    def partial_fit(self, X, y):
+        """
+        Online clonal selection on one mini-batch, resuming from the current memory.
+
+        Every antigen stimulates its BMU; when the best mutated clone is closer
+        to the antigen than the BMU, the clone joins the memory with the
+        antigen's label. Once there are more than max_cells cells, the ones
+        least recently stimulated are dropped, so memory stays bounded however
+        long the stream is. Only the batch is converted to float in memory, so
+        X can be a slice of an np.memmap.
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        if self.cells is None:
+            # Initialize memory cells with random detectors from the first batch
+            idxs = np.random.choice(len(X), min(self.n_detectors, len(X)), replace=False)
+            self.cells, self.labels = X[idxs].copy(), y[idxs]
+        if self.last_used is None or len(self.last_used) != len(self.cells):
+            self.last_used = np.zeros(len(self.cells), dtype=np.int64)
+        elif not self.last_used.flags.writeable:
+            self.last_used = np.array(self.last_used)  # Memory-mapped from a saved model
+        self.n_batches_seen += 1
+
+        new_cells, new_labels = [], []
+        for start in range(0, len(X), self.block_size):
+            antigens, labels = X[start:start + self.block_size], y[start:start + self.block_size]
+            bmu, improved, best_clones = self._clone_step(antigens)
+            self.last_used[bmu] = self.n_batches_seen
+            new_cells.append(best_clones[improved])
+            new_labels.append(labels[improved])
+
+        self.cells = np.concatenate([self.cells] + new_cells)
+        self.labels = np.concatenate([self.labels] + new_labels)
+        self.last_used = np.concatenate((self.last_used,
+                                         np.full(len(self.cells) - len(self.last_used), self.n_batches_seen)))
+        if len(self.cells) > self.max_cells:
+            # Keep the most recently used cells, in their current order
+            keep = np.sort(np.argsort(-self.last_used, kind='stable')[:self.max_cells])
+            self.cells, self.labels, self.last_used = self.cells[keep], self.labels[keep], self.last_used[keep]
+
+        self.n_samples_seen += len(X)
+        self.cell_index = None  # Rebuilt by predict when an index is configured
+        return self
+
+    def fit_stream(self, batches, report_every=None):
+        """
+        partial_fit on every (X, y) batch of an iterable, e.g. iter_batches over
+        memory-mapped arrays or a generator reading from a sensor.
+
+        Prints progress every report_every batches if given, and returns the
+        throughput in samples per second.
+        """
+        start = time.perf_counter()
+        samples = 0
+        for batch, (X, y) in enumerate(batches, 1):
+            self.partial_fit(X, y)
+            samples += len(X)
+            if report_every and batch % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"Batch {batch}: {samples} samples, {samples / elapsed:.0f} samples/s, "
+                      f"{len(self.cells)} memory cells")
+        elapsed = time.perf_counter() - start
+        return samples / elapsed if elapsed > 0 else 0.0
+
+    def build_index(self, index=None, **index_options):
+        """(Re)build the nearest-cell index; without arguments the configured one"""
+        if index is not None:
+            self.index, self.index_options = index, index_options
+        self.cell_index = None
+        if self.index is not None:
+            self.cell_index = CellIndex(self.cells, self.index, block_size=self.block_size,
+                                        **self.index_options)
+
+    def _clone_step(self, antigens):
+        """BMU of every antigen, whether its best clone is closer, and that best clone"""
+        bmu, bmu_distances = nearest_cells(self.cells, antigens, self.block_size)
+
+        # Clone every BMU n_clones times and mutate the clones: (antigens, n_clones, features)
+        clones = self.cells[bmu][:, None, :] + np.random.normal(
+            0, self.mutation_rate, size=(len(antigens), self.n_clones, antigens.shape[1]))
+        clone_distances = np.linalg.norm(clones - antigens[:, None, :], axis=2)
+        best = np.argmin(clone_distances, axis=1)
+        rows = np.arange(len(antigens))
+        return bmu, clone_distances[rows, best] < bmu_distances, clones[rows, best]
+
+    def _select(self, antigens, labels):
+        """One clonal selection step for a block of antigens: the new memory cell of each"""
+        bmu, improved, best_clones = self._clone_step(antigens)
+
+        # Replace if better affinity: the best clone, labelled with the antigen's class
+        cells = np.where(improved[:, None], best_clones, self.cells[bmu])
+        return cells, np.where(improved, labels, self.labels[bmu])
+
+    def predict(self, X):
+        if self.cell_index is None and self.index is not None:
+            self.build_index()
+        if self.cell_index is not None:
+            nearest, _ = self.cell_index.query(X)
+        else:
+            nearest, _ = nearest_cells(self.cells, X, self.block_size)
+        return self.labels[nearest]
+
+
+# Constructor arguments and arrays stored for each model class
+_SAVED_FIELDS = {
+    'SimpleAIRS': (('num_detectors', 'block_size', 'index', 'index_options'),
+                   ('detectors', 'detector_labels')),
+    'ArtificialImmuneClassifier': (('n_detectors', 'n_clones', 'mutation_rate', 'n_generations', 'block_size',
+                                    'index', 'index_options', 'max_cells'),
+                                   ('cells', 'labels', 'last_used')),
+}
+# Training counters stored with every model
+_SAVED_STATE = ('n_batches_seen', 'n_samples_seen')
+
+
+def save_model(model, path):
+    """
+    Write a trained SimpleAIRS or ArtificialImmuneClassifier to path.
+
+    Cells are stored as contiguous float32 and labels as their integer type.
+    The file is written next to path and renamed into place, so a reader
+    never opens a half-written model.
+    """
+    model_type = type(model).__name__
+    params, array_names = _SAVED_FIELDS[model_type]
+    arrays = {}
+    for name in array_names:
+        array = getattr(model, name, None)
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array, dtype=np.float32 if name in ('cells', 'detectors') else None)
+        if array.dtype.hasobject:
+            raise ValueError(f"{name} must be numeric to be saved, got {array.dtype}")
+        arrays[name] = array
+
+    header = {'format_version': FORMAT_VERSION, 'model': model_type,
+              'params': {name: getattr(model, name) for name in params},
+              'state': {name: getattr(model, name, 0) for name in _SAVED_STATE},
+              'arrays': {}}
+    # Offsets depend on the header length, which depends on the offsets: grow the reserved
+    # header size until the header with its offsets fits
+    header_size = len(json.dumps(header))
+    while True:
+        offset = -(-(len(MAGIC) + 4 + header_size) // ALIGNMENT) * ALIGNMENT
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        encoded = json.dumps(header).encode()
+        if len(encoded) <= header_size:
+            break
+        header_size = len(encoded) + 64
+    encoded += b" " * (header_size - len(encoded))
+
+    partial_path = f"{path}.{os.getpid()}.partial"
+    with open(partial_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', header_size) + encoded)
+        for name, array in arrays.items():
+            f.seek(header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+    os.replace(partial_path, path)
+
+
+def read_model_header(path):
+    """
+    The JSON header of a saved model.
+
+    Raises ValueError for other files and format versions, and for headers
+    naming an unknown model, fields it does not save or arrays that do not
+    lie inside the file.
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + 4)
+        if len(prefix) < len(MAGIC) + 4 or prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a saved immune classifier model")
+        header_size, = struct.unpack('<I', prefix[len(MAGIC):])
+        header = json.loads(f.read(header_size))
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"{path}: model format version {header.get('format_version')}, "
+                         f"expected {FORMAT_VERSION}")
+
+    if header.get('model') not in _SAVED_FIELDS:
+        raise ValueError(f"{path}: unknown model type {header.get('model')!r}")
+    params, array_names = _SAVED_FIELDS[header['model']]
+    if set(header.get('params', ())) != set(params):
+        raise ValueError(f"{path}: parameters {sorted(header.get('params', ()))} do not match "
+                         f"{header['model']}")
+    if not set(header.get('state', ())) <= set(_SAVED_STATE):
+        raise ValueError(f"{path}: unknown state {sorted(set(header['state']) - set(_SAVED_STATE))}")
+    # Arrays that were None when the model was saved are left out
+    if not set(header.get('arrays', ())) <= set(array_names):
+        raise ValueError(f"{path}: arrays {sorted(header.get('arrays', ()))} do not match "
+                         f"{header['model']}")
+
+    file_size = os.path.getsize(path)
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        if dtype.hasobject:
+            raise ValueError(f"{path}: array {name} has non-numeric dtype {dtype}")
+        nbytes = dtype.itemsize * int(np.prod(spec['shape']))
+        if (min(spec['shape'], default=0) < 0 or spec['offset'] < len(MAGIC) + 4 + header_size
+                or spec['offset'] + nbytes > file_size):
+            raise ValueError(f"{path}: array {name} at offset {spec['offset']} ({nbytes} bytes) "
+                             f"lies outside the {file_size}-byte file")
+    return header
+
+
+def load_model(path, mmap=True):
+    """
+    Load a model written by save_model.
+
+    With mmap=True the arrays are read-only np.memmap views of the file, so
+    loading costs a header read and processes serving the same file share
+    its pages. Training again (fit, partial_fit) replaces them with in-memory
+    arrays. mmap=False reads everything into memory.
+    """
+    header = read_model_header(path)
+    model = globals()[header['model']](**header['params'])
+    for name, state in header['state'].items():
+        setattr(model, name, state)
+    for name, spec in header['arrays'].items():
+        if mmap:
+            array = np.memmap(path, dtype=np.dtype(spec['dtype']), mode='r', offset=spec['offset'],
+                              shape=tuple(spec['shape']))
+        else:
+            with open(path, 'rb') as f:
+                f.seek(spec['offset'])
+                array = np.fromfile(f, dtype=np.dtype(spec['dtype']), count=int(np.prod(spec['shape'])))
+            array = array.reshape(spec['shape'])
+        setattr(model, name, array)
+    return model
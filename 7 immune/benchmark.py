@@ -0,0 +1,56 @@
+import argparse
+import time
+
+import numpy as np
+from sklearn.datasets import make_classification
+
+from airs import ArtificialImmuneClassifier, nearest_cells
+
+# Prediction latency and accuracy of the nearest-cell indexes against the brute-force scan,
+# for a classifier with tens of thousands of memory cells (one per training sample)
+# recall: fraction of queries whose nearest cell is the exact one
+
+INDEXES = [(None, {}), ("kdtree", {}), ("ivf", {"n_probe": 1}), ("ivf", {"n_probe": 4}),
+           ("ivf", {"n_probe": 16})]
+
+def timed_predict(model, X, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictions = model.predict(X)
+        best = min(best, time.perf_counter() - start)
+    return predictions, best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cells", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--features", type=int, nargs="+", default=[4, 10, 100])
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    print(f"{'features':>8} {'index':>16} {'build s':>8} {'us/query':>9} {'accuracy':>9} {'recall':>7}")
+    for n_features in args.features:
+        X, y = make_classification(n_samples=args.cells + args.queries, n_features=n_features,
+                                   n_informative=min(6, n_features), n_redundant=max(0, min(2, n_features - 6)),
+                                   n_classes=2, random_state=42)
+        X_train, y_train = X[:args.cells], y[:args.cells]
+        X_test, y_test = X[args.cells:], y[args.cells:]
+        model = ArtificialImmuneClassifier(n_detectors=20, n_clones=10, mutation_rate=0.05, n_generations=1)
+        model.fit(X_train, y_train)
+        exact, _ = nearest_cells(model.cells, X_test)
+
+        for index, options in INDEXES:
+            start = time.perf_counter()
+            if index is None:
+                model.cell_index = None
+            else:
+                model.build_index(index, **options)
+            build = time.perf_counter() - start
+
+            predictions, seconds = timed_predict(model, X_test)
+            nearest = model.cell_index.query(X_test)[0] if model.cell_index is not None else exact
+            name = index or "brute"
+            name += "".join(f" {key}={value}" for key, value in options.items())
+            print(f"{n_features:>8} {name:>16} {build:>8.3f} {1e6 * seconds / len(X_test):>9.1f} "
+                  f"{np.mean(predictions == y_test):>9.3f} {np.mean(nearest == exact):>7.3f}")
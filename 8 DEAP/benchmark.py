@@ -0,0 +1,43 @@
+import argparse
+import math
+import multiprocessing
+import random
+import time
+
+from main import PoolMap, eval_func, run, toolbox
+
+# Benchmark of the process-pool toolbox.map against the builtin map.
+# The cheap variant is eval_func itself, where pickling costs more than evaluating;
+# the expensive one burns a fixed amount of CPU per individual, like a simulation would.
+
+def eval_func_expensive(individual, work=20000):
+    # Same fitness as eval_func, after `work` iterations of throwaway arithmetic
+    for i in range(work):
+        math.sin(i * individual[0])
+    return eval_func(individual)
+
+def time_run(evaluate, pool_map, population_size, generations):
+    toolbox.register("evaluate", evaluate)
+    toolbox.register("map", pool_map if pool_map is not None else map)
+    random.seed(0)
+    start = time.perf_counter()
+    run(toolbox, population_size=population_size, generations=generations)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--population", type=int, default=200)
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--max-workers", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    workers = sorted({1, 2, 4, 8, args.max_workers} & set(range(1, args.max_workers + 1)))
+    print(f"{'eval_func':>10} {'workers':>8} {'seconds':>9} {'speedup':>8}")
+    for name, evaluate in [("cheap", eval_func), ("expensive", eval_func_expensive)]:
+        serial = time_run(evaluate, None, args.population, args.generations)
+        print(f"{name:>10} {'serial':>8} {serial:>9.3f} {1.0:>8.2f}")
+        for n in workers:
+            with PoolMap(processes=n, chunksize=args.chunksize) as pool_map:
+                seconds = time_run(evaluate, pool_map, args.population, args.generations)
+            print(f"{name:>10} {n:>8} {seconds:>9.3f} {serial / seconds:>8.2f}")
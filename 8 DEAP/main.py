@@ -1,4 +1,7 @@
+import math
+import multiprocessing
 import random
+import numpy as np
 from deap import base, creator, tools, algorithms
 
 # Define the evaluation function (minimize a simple mathematical function)
@@ -6,7 +9,69 @@ def eval_func(individual):
     # Example evaluation function (minimize a quadratic function)
     return sum(x ** 2 for x in individual),
 
-# DEAP setup
+# Parallel evaluation backend: register an instance as toolbox.map
+# The pool is created once and its workers live for the whole run, so a generation only pays
+# for sending the individuals and fitnesses back and forth, in chunks of `chunksize`
+class PoolMap:
+    def __init__(self, processes=None, chunksize=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunksize = chunksize  # None: about 4 chunks per worker and call
+        self.pool = multiprocessing.Pool(self.processes)
+
+    def __call__(self, func, *iterables):
+        items = list(zip(*iterables))
+        chunksize = self.chunksize or max(1, math.ceil(len(items) / (4 * self.processes)))
+        if len(iterables) == 1:
+            return self.pool.map(func, [item[0] for item in items], chunksize=chunksize)
+        return self.pool.starmap(func, items, chunksize=chunksize)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Optional fitness cache keyed on the genotype (the tuple of genes), so identical individuals
+# produced by selection and cloning are only scored once
+# hits/misses count the whole run; the per-generation numbers are returned by evaluate_invalid
+class FitnessCache:
+    def __init__(self):
+        self.fitnesses = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.fitnesses)
+
+# Evaluate the individuals without a valid fitness; varAnd keeps the fitness of those it did not
+# modify, so only the crossed-over and mutated ones are scored
+# Returns a per-generation dict with the number of evaluations and cache hits/misses
+def evaluate_invalid(toolbox, individuals, cache=None):
+    invalid = [ind for ind in individuals if not ind.fitness.valid]
+    if cache is None:
+        fits = toolbox.map(toolbox.evaluate, invalid)
+        for fit, ind in zip(fits, invalid):
+            ind.fitness.values = fit  # Assign fitness values to individuals
+        return {'evaluated': len(invalid), 'hits': 0, 'misses': 0}
+
+    # Genotypes not in the cache, each scored once even if it appears several times
+    keys = [tuple(ind) for ind in invalid]
+    missing = {key: ind for key, ind in zip(keys, invalid) if key not in cache.fitnesses}
+    fits = toolbox.map(toolbox.evaluate, list(missing.values()))
+    cache.fitnesses.update(zip(missing.keys(), fits))
+    for key, ind in zip(keys, invalid):
+        ind.fitness.values = cache.fitnesses[key]
+
+    hits = len(invalid) - len(missing)
+    cache.hits += hits
+    cache.misses += len(missing)
+    return {'evaluated': len(missing), 'hits': hits, 'misses': len(missing)}
+
+# DEAP setup (at module level so worker processes see the same classes)
 creator.create("FitnessMin", base.Fitness, weights=(-1.0,))  # Minimize the fitness value
 creator.create("Individual", list, fitness=creator.FitnessMin)  # Individuals are lists of floats
 
@@ -23,29 +88,134 @@ toolbox.register("mate", tools.cxBlend, alpha=0.5)  # Blend crossover
 toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.2)  # Gaussian mutation
 toolbox.register("select", tools.selTournament, tournsize=3)  # Tournament selection
 
-# Create population
-population = toolbox.population(n=50)
+# Fitness statistics, recorded every generation when run/run_batch get a logbook
+fitness_stats = tools.Statistics(key=lambda ind: ind.fitness.values[0])
+fitness_stats.register("avg", np.mean)
+fitness_stats.register("min", np.min)
+fitness_stats.register("max", np.max)
+
+# Array-backed mode: the population is one contiguous (n, dim) float array and each individual
+# is a view of one row, carrying its fitness and row number. Evaluation, crossover and mutation
+# run on the whole block; only selection works on the individuals, so DEAP's selTournament and
+# selBest are used unchanged
+creator.create("ArrayIndividual", np.ndarray, fitness=creator.FitnessMin)
+
+# Batched eval_func: the fitness of every row of the block
+def eval_func_batch(block):
+    return np.einsum('ij,ij->i', block, block)
+
+# Wrap the rows of a block as individuals (views, no copies) with their known fitnesses
+def as_individuals(block, fitnesses):
+    individuals = []
+    for row, (genes, fit) in enumerate(zip(block, fitnesses)):
+        ind = genes.view(creator.ArrayIndividual)
+        ind.fitness = creator.FitnessMin((fit,))
+        ind.row = row
+        individuals.append(ind)
+    return individuals
+
+# varAnd on a block, in place: cxBlend on consecutive pairs with probability cxpb, then
+# mutGaussian on each row with probability mutpb
+# Returns a mask of the rows whose fitness is no longer valid
+def var_and_batch(block, cxpb, mutpb, rng, alpha=0.5, mu=0.0, sigma=1.0, indpb=0.2):
+    invalid = np.zeros(len(block), dtype=bool)
+
+    # Blend crossover
+    pairs = 2 * np.flatnonzero(rng.random(len(block) // 2) < cxpb)
+    first, second = block[pairs], block[pairs + 1]
+    gamma = (1.0 + 2.0 * alpha) * rng.random(first.shape) - alpha
+    block[pairs] = (1.0 - gamma) * first + gamma * second
+    block[pairs + 1] = gamma * first + (1.0 - gamma) * second
+    invalid[pairs] = invalid[pairs + 1] = True
+
+    # Gaussian mutation, gene-wise with probability indpb
+    rows = np.flatnonzero(rng.random(len(block)) < mutpb)
+    genes = rng.random((len(rows), block.shape[1])) < indpb
+    block[rows] += np.where(genes, rng.normal(mu, sigma, genes.shape), 0.0)
+    invalid[rows] = True
+    return invalid
+
+# Run the algorithm; evaluation goes through toolbox.map (builtin map unless a PoolMap is registered)
+# If stats_log is a list, the evaluate_invalid numbers of every generation are appended to it
+def run(toolbox, population_size=50, generations=20, cache=None, stats_log=None, logbook=None):
+    # Create and evaluate the initial population
+    population = toolbox.population(n=population_size)
+    evaluate_invalid(toolbox, population, cache)
+
+    for gen in range(generations):
+        # Apply genetic operations (crossover and mutation)
+        offspring = algorithms.varAnd(population, toolbox, cxpb=0.5, mutpb=0.1)
+
+        # Evaluate the offspring whose fitness was invalidated
+        stats = evaluate_invalid(toolbox, offspring, cache)
+        if stats_log is not None:
+            stats_log.append(stats)
+
+        # Select the next generation
+        population = toolbox.select(offspring, k=len(population))
+        if logbook is not None:
+            logbook.record(gen=gen, **fitness_stats.compile(population))
+
+    return population
+
+# The same algorithm in array-backed mode, with the operators of the list-based toolbox.
+# seed drives the NumPy generator used for initialisation and variation; DEAP's selection
+# operators draw from the global random module, so that is seeded with it too
+def run_batch(toolbox, population_size=50, generations=20, dim=3, cxpb=0.5, mutpb=0.1, seed=None,
+              logbook=None):
+    rng = np.random.default_rng(seed)
+    if seed is not None:
+        random.seed(seed)
+    block = rng.uniform(-5.0, 5.0, (population_size, dim))
+    fitnesses = eval_func_batch(block)
+
+    for gen in range(generations):
+        # Apply genetic operations to a copy of the block (the clone step of varAnd)
+        offspring, offspring_fitnesses = block.copy(), fitnesses.copy()
+        invalid = var_and_batch(offspring, cxpb, mutpb, rng)
+
+        # Evaluate only the rows that changed
+        offspring_fitnesses[invalid] = eval_func_batch(offspring[invalid])
+
+        # Select the next generation and gather the chosen rows into a new contiguous block
+        selected = toolbox.select(as_individuals(offspring, offspring_fitnesses), k=population_size)
+        rows = [ind.row for ind in selected]
+        block, fitnesses = offspring[rows], offspring_fitnesses[rows]
+        if logbook is not None:
+            logbook.record(gen=gen, **fitness_stats.compile(as_individuals(block, fitnesses)))
+
+    return as_individuals(block, fitnesses)
 
-# Genetic Algorithm parameters
-generations = 20
+if __name__ == "__main__":
+    # Genetic Algorithm parameters
+    generations = 20
 
-# Run the algorithm
-for gen in range(generations):
-    # Apply genetic operations (crossover and mutation)
-    offspring = algorithms.varAnd(population, toolbox, cxpb=0.5, mutpb=0.1)
+    cache = FitnessCache()
+    stats_log = []
+    with PoolMap() as pool_map:
+        toolbox.register("map", pool_map)
+        population = run(toolbox, population_size=50, generations=generations, cache=cache,
+                         stats_log=stats_log)
 
-    # Evaluate the fitness of the offspring
-    fits = list(map(toolbox.evaluate, offspring))  # Evaluate using the map function
-    for fit, ind in zip(fits, offspring):
-        ind.fitness.values = fit  # Assign fitness values to individuals
+    for gen, stats in enumerate(stats_log):
+        print(f"Generation {gen}: evaluated {stats['evaluated']}, "
+              f"cache hits {stats['hits']}, misses {stats['misses']}")
+    # The original loop evaluated all 50 offspring every generation and never the initial
+    # population; cache.misses also counts the 50 initial evaluations
+    print(f"Evaluations: {cache.misses} (including the initial population) instead of "
+          f"the original loop's {generations * 50} "
+          f"(cache hit rate {cache.hits / max(1, cache.hits + cache.misses):.1%})")
 
-    # Select the next generation
-    population = toolbox.select(offspring, k=len(population))
+    # Get the best individual after generations
+    best_ind = tools.selBest(population, k=1)[0]
+    best_fitness = best_ind.fitness.values[0]
 
-# Get the best individual after generations
-best_ind = tools.selBest(population, k=1)[0]
-best_fitness = best_ind.fitness.values[0]
+    # Print the results
+    print("Best individual:", best_ind)
+    print("Best fitness:", best_fitness)
 
-# Print the results
-print("Best individual:", best_ind)
-print("Best fitness:", best_fitness)
\ No newline at end of file
+    # Array-backed run of the same algorithm on a 100-dimensional problem
+    logbook = tools.Logbook()
+    population = run_batch(toolbox, population_size=50, generations=generations, dim=100, logbook=logbook)
+    print(logbook.stream)
+    print("Best fitness (array-backed, 100 genes):", tools.selBest(population, k=1)[0].fitness.values[0])
\ No newline at end of file
@@ -1,8 +1,12 @@
 import random
 import math
+import time
+
+from local_search import improve_tour, matrix_distance, neighbour_lists
 
 class AntColony:
-    def __init__(self, distances, n_ants, n_best, n_iterations, decay, alpha=1, beta=2):
+    def __init__(self, distances, n_ants, n_best, n_iterations, decay, alpha=1, beta=2,
+                 local_search=None, n_neighbours=10):
         """
         distances: 2D matrix of distances between cities
         n_ants: number of ants per iteration
@@ -11,9 +15,14 @@ class AntColony:
         decay: rate at which pheromone decays
         alpha: influence of pheromone
         beta: influence of distance
+        local_search: None, "best" to improve the iteration-best path or "all"
+            to improve every ant's path with 2-opt/Or-opt before depositing
+        n_neighbours: neighbour list size used by local search
         """
         self.distances = distances
         self.pheromone = [[1 / len(distances) for j in range(len(distances))] for i in range(len(distances))]
+        # Decay is kept as one running factor instead of rescaling every entry
+        self.pheromone_scale = 1.0
         self.all_inds = range(len(distances))
         self.n_ants = n_ants
         self.n_best = n_best
@@ -21,22 +30,14 @@ class AntColony:
         self.decay = decay
         self.alpha = alpha
         self.beta = beta
+        self.local_search = local_search
+        self.neighbours = neighbour_lists(distances, n_neighbours) if local_search else None
+        self.timings = {'construction': 0.0, 'local_search': 0.0}
 
     def run(self):
-        shortest_path = None
-        all_time_shortest_path = ("placeholder", math.inf)
-        for i in range(self.n_iterations):
-            all_paths = self.gen_all_paths()
-            self.spread_pheromone(all_paths, self.n_best, shortest_path=shortest_path)
-            shortest_path = min(all_paths, key=lambda x: x[1])
-            if shortest_path[1] < all_time_shortest_path[1]:
-                all_time_shortest_path = shortest_path
-            
-            # Print iteration result
-            path_str = ' -> '.join([str(move[0]) for move in shortest_path[0]] + [str(shortest_path[0][-1][1])])
-            print(f"Iteration {i+1:3d}: Best path = {path_str} | Distance = {shortest_path[1]:.2f}")
-            
-            self.pheromone = [[col * self.decay for col in row] for row in self.pheromone]
+        best_path, best_dist, _, _, _ = self.run_until(max_iterations=self.n_iterations,
+                                                       callback=print_iteration)
+        all_time_shortest_path = (best_path, best_dist)
 
         print("\nAll-time shortest path found:")
         final_path_str = ' -> '.join([str(move[0]) for move in all_time_shortest_path[0]] + [str(all_time_shortest_path[0][-1][1])])
@@ -44,11 +45,90 @@ class AntColony:
         print(f"Distance = {all_time_shortest_path[1]:.2f}")
         return all_time_shortest_path
 
+    def run_until(self, time_budget=None, stagnation=None, epsilon=0.0, max_iterations=None, callback=None):
+        """
+        time_budget: wall-clock seconds; no new iteration starts after it is spent
+        stagnation: stop after this many iterations without an improvement above epsilon
+        epsilon: smallest improvement of the best distance that counts
+        max_iterations: hard cap on iterations, n_iterations if no other rule is given
+        callback: called as callback(iteration, best_dist) after every iteration, with the
+            all-time best distance, like AntColonyOptimizer.run_until in aco.py
+
+        Returns the all-time shortest path (a list of moves), its distance, the best
+        distance after every iteration, the seconds until it was found and the number
+        of iterations it took.
+        """
+        if time_budget is None and stagnation is None and max_iterations is None:
+            max_iterations = self.n_iterations
+        start = time.perf_counter()
+        shortest_path = None
+        all_time_shortest_path = (None, math.inf)
+        all_best_dists = []
+        time_to_best, iterations_to_best = 0.0, 0
+        reference_dist, last_improvement = math.inf, 0
+        i = 0
+        while max_iterations is None or i < max_iterations:
+            shortest_path = self.step(shortest_path)
+            if shortest_path[1] < all_time_shortest_path[1]:
+                all_time_shortest_path = shortest_path
+                time_to_best = time.perf_counter() - start
+                iterations_to_best = i + 1
+            if all_time_shortest_path[1] < reference_dist - epsilon:
+                reference_dist, last_improvement = all_time_shortest_path[1], i
+
+            all_best_dists.append(all_time_shortest_path[1])
+            if callback is not None:
+                callback(i, all_time_shortest_path[1])
+            i += 1
+            if stagnation is not None and i - 1 - last_improvement >= stagnation:
+                break
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                break
+        best_path, best_dist = all_time_shortest_path
+        return best_path, best_dist, all_best_dists, time_to_best, iterations_to_best
+
+    def step(self, shortest_path=None):
+        start = time.perf_counter()
+        all_paths = self.gen_all_paths()
+        constructed = time.perf_counter()
+        if self.local_search:
+            all_paths = self.improve_paths(all_paths)
+        self.timings['construction'] += constructed - start
+        self.timings['local_search'] += time.perf_counter() - constructed
+        self.spread_pheromone(all_paths, self.n_best, shortest_path=shortest_path)
+        self.decay_pheromone()
+        return min(all_paths, key=lambda x: x[1])
+
     def spread_pheromone(self, all_paths, n_best, shortest_path):
         sorted_paths = sorted(all_paths, key=lambda x: x[1])
         for path, dist in sorted_paths[:n_best]:
             for move in path:
-                self.pheromone[move[0]][move[1]] += 1.0 / self.distances[move[0]][move[1]]
+                # Stored values are scaled by 1 / pheromone_scale
+                self.pheromone[move[0]][move[1]] += 1.0 / self.distances[move[0]][move[1]] / self.pheromone_scale
+
+    def decay_pheromone(self):
+        # pick_move normalizes each row, so a common factor never changes a choice
+        # and only has to be folded into the values before it underflows
+        self.pheromone_scale *= self.decay
+        if self.pheromone_scale < 1e-20:
+            self.pheromone = [[col * self.pheromone_scale for col in row] for row in self.pheromone]
+            self.pheromone_scale = 1.0
+
+    def improve_paths(self, all_paths):
+        if self.local_search == "best":
+            targets = [min(range(len(all_paths)), key=lambda i: all_paths[i][1])]
+        else:
+            targets = range(len(all_paths))
+        improved = list(all_paths)
+        for i in targets:
+            tour, _ = improve_tour([move[0] for move in all_paths[i][0]],
+                                   matrix_distance(self.distances), self.neighbours)
+            # Rotate back so the path still starts and ends at the start city
+            start = tour.index(all_paths[i][0][0][0])
+            tour = tour[start:] + tour[:start]
+            path = [(tour[j], tour[(j + 1) % len(tour)]) for j in range(len(tour))]
+            improved[i] = (path, self.gen_path_dist(path))
+        return improved
 
     def gen_path_dist(self, path):
         total_dist = 0
@@ -90,6 +170,10 @@ class AntColony:
         return move
 
 
+def print_iteration(i, best_dist):
+    print(f"Iteration {i+1:3d}: Best distance = {best_dist:.2f}")
+
+
 # Example usage with sample distance matrix
 if __name__ == "__main__":
     # Distance matrix between 5 cities
@@ -101,8 +185,11 @@ if __name__ == "__main__":
         [7, 2, 3, 2, 0]
     ]
 
-    colony = AntColony(distances, n_ants=10, n_best=3, n_iterations=100, decay=0.95, alpha=1, beta=2)
+    colony = AntColony(distances, n_ants=10, n_best=3, n_iterations=100, decay=0.95, alpha=1, beta=2,
+                       local_search="best")
     shortest_path = colony.run()
+    print(f"Construction time: {colony.timings['construction']:.4f} s, "
+          f"local search time: {colony.timings['local_search']:.4f} s")
     
     print("\nShortest path found:")
     print(shortest_path[0])
@@ -1,10 +1,22 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import random
+import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Barrier
+from multiprocessing.shared_memory import SharedMemory
+
+from instances import COORD_TYPES, coordinate_distances, edge_weight_type, euclidean_distances, load_tsplib
+from local_search import coordinate_distance, improve_tour, matrix_distance, neighbour_lists
+from neighbours import nearest_neighbours
+from pheromones import CompactPheromones
 
 class AntColonyOptimizer:
-    def __init__(self, distances, n_ants=10, decay=0.95, alpha=1.0, beta=2.0):
+    def __init__(self, distances, n_ants=10, decay=0.95, alpha=1.0, beta=2.0,
+                 construction="loop", seed=None, x_coords=None, y_coords=None,
+                 n_candidates=None, local_search=None, local_search_moves=("2-opt", "or-opt"),
+                 n_neighbours=10, compact_pheromones=False, weight_type=None):
         """
         Initialize the ACO solver.
         
@@ -14,44 +26,190 @@ class AntColonyOptimizer:
         - decay: pheromone decay rate
         - alpha: pheromone importance
         - beta: distance importance
+        - construction: "loop" builds one ant at a time, "vectorized" builds
+          all ants' tours together with NumPy
+        - seed: seed for the solver's random number generators
+        - x_coords, y_coords: city coordinates, needed for candidate lists
+          when there is no distance matrix
+        - n_candidates: if set, every city only considers its n_candidates
+          nearest neighbours and tours are built for all ants together.
+          Neighbours are ranked by the distance matrix if there is one, so
+          EXPLICIT instances work too. distances may be None if coordinates
+          are given; lengths are then Euclidean. Pheromone is kept only on
+          candidate edges.
+        - local_search: None, "best" to improve the iteration-best tour or
+          "all" to improve every ant's tour before pheromone is deposited
+        - local_search_moves: the moves used by local search
+        - n_neighbours: neighbour list size for local search when there are
+          no candidate lists
+        - compact_pheromones: keep the full pheromone matrix as a float32
+          upper triangle with lazy decay (see CompactPheromones)
+        - weight_type: how the distance matrix follows from the coordinates,
+          used for the rows of added and moved cities: None for exact
+          Euclidean distances (as generate_random_cities builds them), a
+          TSPLIB type from COORD_TYPES (see edge_weight_type), or "EXPLICIT"
+          for a matrix with no such rule, which cannot gain or move cities
         """
+        if construction not in ("loop", "vectorized"):
+            raise ValueError(f"Unknown construction mode: {construction!r}")
+        if local_search not in (None, "best", "all"):
+            raise ValueError(f"Unknown local search mode: {local_search!r}")
+        if distances is None and (n_candidates is None or x_coords is None):
+            raise ValueError("distances can only be omitted in candidate-list mode")
+        if distances is None and y_coords is None:
+            raise ValueError("Candidate lists without distances need x_coords and y_coords")
+        if compact_pheromones and n_candidates is not None:
+            raise ValueError("Candidate lists already keep pheromone only on candidate edges")
+        if weight_type is not None and weight_type not in COORD_TYPES + ("EXPLICIT",):
+            raise ValueError(f"Unknown weight type: {weight_type!r}")
+        if distances is None and weight_type is not None:
+            raise ValueError("Without a distance matrix, lengths are always exact Euclidean")
+        self.weight_type = weight_type
         self.distances = distances
-        self.n_cities = len(distances)
+        self.n_cities = len(distances) if distances is not None else len(x_coords)
         self.n_ants = n_ants
         self.decay = decay
         self.alpha = alpha
         self.beta = beta
-        self.pheromones = np.ones((self.n_cities, self.n_cities))
+        self.construction = construction
+        self.local_search = local_search
+        self.local_search_moves = local_search_moves
+        self.n_neighbours = n_neighbours
+        self.neighbours = None  # Built on first use by improve_paths
+        self.distance_function = None
+        self.timings = {'construction': 0.0, 'local_search': 0.0}
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
         self.all_inds = range(self.n_cities)
+        self.coords = None
+        self.n_candidates = n_candidates
+        self.candidates = None
+        if x_coords is not None and y_coords is not None:
+            self.coords = np.column_stack((x_coords, y_coords)).astype(float)
+        
+        # Best tour over all runs, so a later run continues from it
+        self.best_path = None
+        self.best_path_length = float('inf')
+        
+        if n_candidates is not None:
+            # pheromones[i, c] and heuristic[i, c] belong to the edge (i, candidates[i, c])
+            self.candidates = self.candidate_lists()
+            self.pheromones = np.ones(self.candidates.shape)
+        elif compact_pheromones:
+            self.pheromones = CompactPheromones(self.n_cities)
+        else:
+            self.pheromones = np.ones((self.n_cities, self.n_cities))
+        self.update_heuristic()
+    
+    def candidate_lists(self):
+        """Each city's n_candidates nearest cities, by the distance matrix if there is one."""
+        if self.distances is not None:
+            return neighbour_lists(self.distances, self.n_candidates)
+        return nearest_neighbours(self.coords[:, 0], self.coords[:, 1], self.n_candidates)
+    
+    def update_heuristic(self):
+        """Recompute eta**beta for every edge the ants can choose."""
+        if self.candidates is not None and self.distances is not None:
+            edge_lengths = np.asarray(self.distances)[np.arange(self.n_cities)[:, None], self.candidates]
+        elif self.candidates is not None:
+            edge_lengths = self.coord_distances(
+                np.repeat(np.arange(self.n_cities), self.candidates.shape[1]),
+                self.candidates.ravel()).reshape(self.candidates.shape)
+        else:
+            edge_lengths = np.asarray(self.distances)
+        
+        # eta**beta only changes with the cities, so it is computed once for vectorized construction
+        safe_distances = np.where(edge_lengths == 0, 1e-10, edge_lengths)
+        self.heuristic = (1.0 / safe_distances) ** self.beta
         
     def run(self, n_iterations):
         """Run the ACO algorithm for n_iterations."""
-        best_path = None
-        best_path_length = float('inf')
+        best_path, best_path_length, all_best_path_lengths, _, _ = self.run_until(
+            max_iterations=n_iterations, callback=print_progress)
+        return best_path, best_path_length, all_best_path_lengths
+    
+    def run_until(self, time_budget=None, stagnation=None, epsilon=0.0,
+                  max_iterations=None, callback=None):
+        """
+        Run the ACO algorithm until a stopping rule fires.
+        
+        Parameters:
+        - time_budget: wall-clock seconds; no new iteration starts after it is spent
+        - stagnation: stop once this many iterations in a row have not
+          improved the best length by more than epsilon
+        - epsilon: smallest improvement that resets the stagnation window
+        - max_iterations: hard cap on the number of iterations
+        - callback: called as callback(iteration, best_path_length) after
+          every iteration, in place of printing progress
+        
+        The search continues from the best path of earlier runs, including
+        one repaired after add_cities, remove_cities or move_cities.
+        
+        Returns the best path, its length, the best length after every
+        iteration, the seconds until the best path was found and the number
+        of iterations it took (counting from 1; 0 if the earlier best held).
+        """
+        if time_budget is None and stagnation is None and max_iterations is None:
+            raise ValueError("Need a time_budget, stagnation window or max_iterations")
+        start = time.perf_counter()
+        best_path = self.best_path
+        best_path_length = self.best_path_length
         all_best_path_lengths = []
+        time_to_best = 0.0
+        iterations_to_best = 0
         
-        for i in range(n_iterations):
-            all_paths = self.gen_all_paths()
-            self.spread_pheromones(all_paths)
-            
-            # Find iteration's best path
-            current_best_path, current_best_path_length = self.find_best_path(all_paths)
+        # Best length at the last improvement larger than epsilon
+        reference_length = float('inf')
+        last_improvement = 0
+        
+        i = 0
+        while max_iterations is None or i < max_iterations:
+            current_best_path, current_best_path_length = self.step()
             
             # Update overall best path
             if current_best_path_length < best_path_length:
-                best_path = current_best_path
-                best_path_length = current_best_path_length
+                best_path = self.best_path = current_best_path
+                best_path_length = self.best_path_length = current_best_path_length
+                time_to_best = time.perf_counter() - start
+                iterations_to_best = i + 1
+            if best_path_length < reference_length - epsilon:
+                reference_length = best_path_length
+                last_improvement = i
             
             all_best_path_lengths.append(best_path_length)
+            if callback is not None:
+                callback(i, best_path_length)
+            i += 1
             
-            # Print progress
-            if i % 10 == 0:
-                print(f"Iteration {i}: Best path length = {best_path_length:.2f}")
+            if stagnation is not None and i - 1 - last_improvement >= stagnation:
+                break
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                break
             
-        return best_path, best_path_length, all_best_path_lengths
+        return best_path, best_path_length, all_best_path_lengths, time_to_best, iterations_to_best
+    
+    def step(self):
+        """Run a single iteration and return the iteration's best path and its length."""
+        start = time.perf_counter()
+        all_paths = self.gen_all_paths()
+        constructed = time.perf_counter()
+        if self.local_search is not None:
+            all_paths = self.improve_paths(all_paths)
+        self.timings['construction'] += constructed - start
+        self.timings['local_search'] += time.perf_counter() - constructed
+        
+        self.spread_pheromones(all_paths)
+        
+        # Find iteration's best path
+        return self.find_best_path(all_paths)
         
     def gen_all_paths(self):
         """Generate paths for all ants."""
+        if self.candidates is not None:
+            return self.gen_all_paths_candidates()
+        if self.construction == "vectorized":
+            return self.gen_all_paths_vectorized()
+        
         all_paths = []
         for ant in range(self.n_ants):
             path = self.gen_path(0)  # Start from city 0
@@ -71,20 +229,155 @@ class AntColonyOptimizer:
             probabilities = self.calculate_probabilities(current, unvisited)
             
             # Choose next city
-            next_city = random.choices(unvisited, weights=probabilities)[0]
+            next_city = self.random.choices(unvisited, weights=probabilities)[0]
             
             path.append(next_city)
             visited.add(next_city)
             
         return path
     
+    def gen_all_paths_vectorized(self):
+        """Generate paths for all ants at once, one step of every tour at a time."""
+        n_ants, n_cities = self.n_ants, self.n_cities
+        compact = isinstance(self.pheromones, CompactPheromones)
+        if not compact:
+            attractiveness = (self.pheromones ** self.alpha) * self.heuristic
+        
+        paths = np.zeros((n_ants, n_cities), dtype=np.intp)  # Every ant starts from city 0
+        visited = np.zeros((n_ants, n_cities), dtype=bool)
+        visited[:, 0] = True
+        ants = np.arange(n_ants)
+        
+        for step in range(1, n_cities):
+            current = paths[:, step - 1]
+            if compact:
+                # Rows are gathered per step so no dense n x n matrix is ever built
+                weights = (self.pheromones.rows(current) ** self.alpha) * self.heuristic[current]
+            else:
+                weights = attractiveness[current]
+            weights[visited] = 0.0
+            next_cities = self.roulette(weights, ~visited)
+            paths[:, step] = next_cities
+            visited[ants, next_cities] = True
+        
+        lengths = self.path_lengths(paths)
+        return [(path.tolist(), float(length)) for path, length in zip(paths, lengths)]
+    
+    def gen_all_paths_candidates(self):
+        """
+        Generate paths for all ants at once, choosing among candidate lists.
+        
+        An ant whose candidates are all visited moves to its nearest unvisited city.
+        """
+        n_ants, n_cities = self.n_ants, self.n_cities
+        attractiveness = (self.pheromones ** self.alpha) * self.heuristic
+        
+        paths = np.zeros((n_ants, n_cities), dtype=np.intp)  # Every ant starts from city 0
+        visited = np.zeros((n_ants, n_cities), dtype=bool)
+        visited[:, 0] = True
+        ants = np.arange(n_ants)
+        
+        for step in range(1, n_cities):
+            current = paths[:, step - 1]
+            candidates = self.candidates[current]
+            open_candidates = ~visited[ants[:, None], candidates]
+            weights = attractiveness[current]
+            weights[~open_candidates] = 0.0
+            
+            next_cities = np.empty(n_ants, dtype=np.intp)
+            has_candidate = open_candidates.any(axis=1)
+            if has_candidate.any():
+                picks = self.roulette(weights[has_candidate], open_candidates[has_candidate])
+                next_cities[has_candidate] = candidates[has_candidate, picks]
+            for ant in np.flatnonzero(~has_candidate):
+                next_cities[ant] = self.nearest_unvisited(current[ant], visited[ant])
+            
+            paths[:, step] = next_cities
+            visited[ants, next_cities] = True
+        
+        lengths = self.path_lengths(paths)
+        return [(path.tolist(), float(length)) for path, length in zip(paths, lengths)]
+    
+    def nearest_unvisited(self, city, visited):
+        """Return the unvisited city closest to city."""
+        unvisited = np.flatnonzero(~visited)
+        if self.distances is not None:
+            distances = np.asarray(self.distances[city])[unvisited]
+        else:
+            distances = self.coord_distances(np.full(len(unvisited), city), unvisited)
+        return unvisited[np.argmin(distances)]
+    
+    def coord_distances(self, cities_from, cities_to):
+        """Euclidean distances between two arrays of cities, from the coordinates."""
+        diff = self.coords[cities_from] - self.coords[cities_to]
+        return np.sqrt((diff ** 2).sum(axis=-1))
+    
+    def roulette(self, weights, allowed):
+        """
+        Pick one column per row of weights with probability proportional to its weight.
+        
+        Rows whose weights sum to zero pick uniformly among their allowed columns,
+        like calculate_probabilities does.
+        """
+        n_rows, n_cols = weights.shape
+        cumulative = np.cumsum(weights, axis=1)
+        totals = cumulative[:, -1]
+        
+        empty = ~(totals > 0) | ~np.isfinite(totals)
+        if empty.any():
+            cumulative[empty] = np.cumsum(allowed[empty], axis=1)
+            totals = cumulative[:, -1]
+        
+        # Offset every row by its index so one searchsorted call serves all rows
+        rows = np.arange(n_rows)
+        offsets = cumulative / totals[:, None] + rows[:, None]
+        targets = rows + self.rng.random(n_rows)
+        picks = np.searchsorted(offsets.ravel(), targets, side='right') - rows * n_cols
+        return np.minimum(picks, n_cols - 1)
+    
+    def improve_paths(self, all_paths):
+        """Run local search on the iteration-best path, or on every path."""
+        if self.neighbours is None:
+            # Moves stop at the first neighbour that is too far, so the lists must be
+            # ranked by the same distances the moves are priced with
+            if self.candidates is not None:
+                self.neighbours = self.candidates
+            elif self.distances is not None:
+                self.neighbours = neighbour_lists(self.distances, self.n_neighbours)
+            else:
+                self.neighbours = nearest_neighbours(self.coords[:, 0], self.coords[:, 1], self.n_neighbours)
+            if self.distances is None:
+                self.distance_function = coordinate_distance(self.coords[:, 0], self.coords[:, 1])
+            else:
+                self.distance_function = matrix_distance(self.distances)
+        
+        if self.local_search == "best":
+            targets = [min(range(len(all_paths)), key=lambda i: all_paths[i][1])]
+        else:
+            targets = range(len(all_paths))
+        
+        improved = list(all_paths)
+        for i in targets:
+            path, path_length = all_paths[i]
+            path, gain = improve_tour(path, self.distance_function, self.neighbours,
+                                      self.local_search_moves)
+            if gain > 0:
+                path_length = float(self.path_lengths(np.asarray([path]))[0])
+            improved[i] = (path, path_length)
+        return improved
+    
     def calculate_probabilities(self, current, unvisited):
         """Calculate transition probabilities."""
         probabilities = []
+        # One row read per step; CompactPheromones would otherwise unpack every edge separately
+        if isinstance(self.pheromones, CompactPheromones):
+            pheromone_row = self.pheromones.row(current)
+        else:
+            pheromone_row = self.pheromones[current]
         
         for city in unvisited:
             # Get pheromone and distance values
-            pheromone = self.pheromones[current, city]
+            pheromone = pheromone_row[city]
             distance = self.distances[current, city]
             
             if distance == 0:  # Avoid division by zero
@@ -104,19 +397,37 @@ class AntColonyOptimizer:
     def spread_pheromones(self, all_paths):
         """Update pheromone levels based on ant paths."""
         # Decay existing pheromones
-        self.pheromones *= self.decay
+        if isinstance(self.pheromones, CompactPheromones):
+            self.pheromones.decay(self.decay)
+        else:
+            self.pheromones *= self.decay
+        self.deposit_pheromones(all_paths)
+    
+    def deposit_pheromones(self, all_paths):
+        """Deposit pheromone along every path, in proportion to its quality."""
+        paths = np.asarray([path for path, _ in all_paths], dtype=np.intp)
+        if paths.size == 0:
+            return
         
-        # Add new pheromones based on path quality
-        for path, path_length in all_paths:
-            # Amount of pheromone to deposit
-            pheromone_amount = 1.0 / path_length
-            
-            # Deposit pheromones on the path
-            for i in range(self.n_cities):
-                city_from = path[i]
-                city_to = path[(i + 1) % self.n_cities]  # Wrap around for the return
-                self.pheromones[city_from, city_to] += pheromone_amount
-                self.pheromones[city_to, city_from] += pheromone_amount  # Symmetric
+        # Every edge of every path in one flat batch, each worth 1/length of its path
+        city_from = paths.ravel()
+        city_to = np.roll(paths, -1, axis=1).ravel()  # Wrap around for the return
+        pheromone_amounts = np.repeat([1.0 / path_length for _, path_length in all_paths],
+                                      paths.shape[1])
+        
+        if self.candidates is not None:
+            self.deposit_candidates(city_from, city_to, pheromone_amounts)
+            self.deposit_candidates(city_to, city_from, pheromone_amounts)  # Symmetric
+        elif isinstance(self.pheromones, CompactPheromones):
+            self.pheromones.deposit(city_from, city_to, pheromone_amounts)  # One entry per edge
+        else:
+            np.add.at(self.pheromones, (city_from, city_to), pheromone_amounts)
+            np.add.at(self.pheromones, (city_to, city_from), pheromone_amounts)  # Symmetric
+    
+    def deposit_candidates(self, city_from, city_to, pheromone_amounts):
+        """Deposit pheromone on the edges that appear in the candidate lists."""
+        rows, slots = np.nonzero(self.candidates[city_from] == city_to[:, None])
+        np.add.at(self.pheromones, (city_from[rows], slots), pheromone_amounts[rows])
     
     def path_length(self, path):
         """Calculate the total length of a path."""
@@ -127,14 +438,317 @@ class AntColonyOptimizer:
             total_length += self.distances[city_from, city_to]
         return total_length
     
+    def path_lengths(self, paths):
+        """Calculate the total length of every path in a (n_paths, n_cities) array."""
+        if self.distances is None:
+            return self.coord_distances(paths, np.roll(paths, -1, axis=1)).sum(axis=1)
+        return self.distances[paths, np.roll(paths, -1, axis=1)].sum(axis=1)
+    
     def find_best_path(self, all_paths):
         """Find the best path from all_paths."""
         best_path, best_path_length = min(all_paths, key=lambda x: x[1])
         return best_path, best_path_length
+    
+    def add_cities(self, x_coords, y_coords):
+        """
+        Add cities at the given coordinates and return their new indices.
+        
+        Learned pheromone is kept; the new edges start at the mean pheromone
+        level and the best path gets the new cities by cheapest insertion.
+        """
+        self.require_coords()
+        new_coords = np.column_stack((np.atleast_1d(x_coords), np.atleast_1d(y_coords))).astype(float)
+        added = np.arange(self.n_cities, self.n_cities + len(new_coords))
+        self.update_cities(np.arange(self.n_cities), np.vstack((self.coords, new_coords)), added)
+        return added
+    
+    def remove_cities(self, cities):
+        """Remove cities; the remaining cities are renumbered in their old order."""
+        keep = np.setdiff1d(np.arange(self.n_cities), cities)
+        coords = self.coords[keep] if self.coords is not None else None
+        self.update_cities(keep, coords, np.empty(0, dtype=np.intp))
+    
+    def move_cities(self, cities, x_coords, y_coords):
+        """Move cities to new coordinates; pheromone on their edges is reset."""
+        self.require_coords()
+        cities = np.atleast_1d(cities)
+        coords = self.coords.copy()
+        coords[cities, 0] = x_coords
+        coords[cities, 1] = y_coords
+        self.update_cities(np.arange(self.n_cities), coords, cities)
+    
+    def require_coords(self):
+        """Check that distances of new and moved cities can be computed like the existing ones."""
+        if self.coords is None:
+            raise ValueError("Adding or moving cities needs x_coords and y_coords")
+        if self.weight_type == "EXPLICIT":
+            raise ValueError("An EXPLICIT distance matrix has no rule for the distances of new or moved cities")
+        # One row is enough to catch a matrix built with another distance function
+        if self.distances is not None and not np.allclose(
+                coordinate_distances(self.coords[:, 0], self.coords[:, 1], [0], self.weight_type)[0],
+                self.distances[0]):
+            raise ValueError(f"The distance matrix does not follow weight_type={self.weight_type!r}; "
+                             f"pass the instance's EDGE_WEIGHT_TYPE")
+    
+    def update_cities(self, keep, coords, changed):
+        """
+        Resize the solver's state to a new city set.
+        
+        keep lists the old indices of the surviving cities, which become
+        cities 0..len(keep)-1; any further rows of coords are new cities.
+        Edges touching the cities in changed (new indices) get fresh
+        distances and the mean pheromone level. Everything else is kept.
+        """
+        n_kept, n_cities = len(keep), len(coords) if coords is not None else len(keep)
+        changed = np.asarray(changed, dtype=np.intp)
+        fresh = np.zeros(n_cities, dtype=bool)
+        fresh[changed] = True
+        
+        # Old label -> new label for surviving cities whose edges are unchanged
+        relabel = np.full(self.n_cities, -1, dtype=np.intp)
+        relabel[keep] = np.arange(n_kept)
+        relabel[keep[fresh[:n_kept]]] = -1
+        
+        old_candidates = self.candidates
+        self.coords = coords
+        if self.distances is not None:
+            distances = np.empty((n_cities, n_cities))
+            distances[:n_kept, :n_kept] = self.distances[np.ix_(keep, keep)]
+            if len(changed):
+                rows = coordinate_distances(coords[:, 0], coords[:, 1], changed, self.weight_type)
+                distances[changed, :] = rows
+                distances[:, changed] = rows.T
+            self.distances = distances
+        
+        if self.candidates is not None:
+            level = self.pheromones.mean()
+            self.candidates = self.candidate_lists()
+            pheromones = np.full(self.candidates.shape, level)
+            
+            # Copy pheromone for candidate edges that existed before with both ends unchanged
+            old_rows = np.full(n_cities, -1, dtype=np.intp)
+            old_rows[:n_kept] = np.where(fresh[:n_kept], -1, keep)
+            rows = np.flatnonzero(old_rows >= 0)
+            old_of_new = np.where(fresh, -1, np.concatenate((keep, np.full(n_cities - n_kept, -1))))
+            targets = old_of_new[self.candidates[rows]]
+            matches = old_candidates[old_rows[rows]][:, None, :] == targets[:, :, None]
+            matches &= targets[:, :, None] >= 0
+            hit_rows, hit_slots, old_slots = np.nonzero(matches)
+            pheromones[rows[hit_rows], hit_slots] = self.pheromones[old_rows[rows[hit_rows]], old_slots]
+            self.pheromones = pheromones
+        elif isinstance(self.pheromones, CompactPheromones):
+            level = self.pheromones.mean()
+            self.pheromones = self.pheromones.resized(keep, n_cities, level)
+            self.pheromones.reset_edges(changed, level)
+        else:
+            old = self.pheromones
+            level = old[~np.eye(len(old), dtype=bool)].mean() if len(old) > 1 else 1.0
+            self.pheromones = np.full((n_cities, n_cities), level)
+            self.pheromones[:n_kept, :n_kept] = old[np.ix_(keep, keep)]
+            self.pheromones[changed, :] = level
+            self.pheromones[:, changed] = level
+        
+        self.n_cities = n_cities
+        self.all_inds = range(n_cities)
+        self.neighbours = None  # Local search lists are rebuilt on next use
+        self.distance_function = None
+        self.update_heuristic()
+        
+        if self.best_path is not None:
+            self.best_path = self.repair_path(relabel[np.asarray(self.best_path)], changed)
+            self.best_path_length = float(self.path_lengths(np.asarray([self.best_path]))[0])
+    
+    def repair_path(self, path, insert):
+        """Drop cities marked -1 from path and add the cities in insert by cheapest insertion."""
+        path = [int(city) for city in path if city >= 0]
+        for city in insert:
+            city = int(city)
+            if len(path) < 2:
+                path.append(city)
+                continue
+            tour = np.asarray(path)
+            following = np.roll(tour, -1)
+            if self.distances is not None:
+                cost = (self.distances[tour, city] + self.distances[city, following]
+                        - self.distances[tour, following])
+            else:
+                cost = (self.coord_distances(tour, city) + self.coord_distances(following, city)
+                        - self.coord_distances(tour, following))
+            position = int(np.argmin(cost)) + 1
+            path.insert(position, city)
+        return path
+
+
+def print_progress(iteration, best_path_length):
+    """Progress callback that prints every 10th iteration, as run always has."""
+    if iteration % 10 == 0:
+        print(f"Iteration {iteration}: Best path length = {best_path_length:.2f}")
+
+
+# Per-process state of an island worker, set up by _init_island
+_island = {}
+
+
+def _attach_array(spec):
+    """Open a (name, shape, dtype) shared-memory spec as an ndarray view."""
+    name, shape, dtype = spec
+    shm = SharedMemory(name=name)
+    _island.setdefault('segments', []).append(shm)  # Keep the mapping alive
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _init_island(barrier, distances_spec, tours_spec, lengths_spec, pheromones_spec):
+    """Attach a pool worker to the arrays shared by all islands."""
+    _island['barrier'] = barrier
+    if isinstance(distances_spec, str):
+        # A cached .npy matrix: every worker maps the same file from the page cache
+        _island['distances'] = np.load(distances_spec, mmap_mode='r')
+    else:
+        _island['distances'] = _attach_array(distances_spec) if distances_spec else None
+    _island['tours'] = _attach_array(tours_spec)
+    _island['lengths'] = _attach_array(lengths_spec)
+    _island['pheromones'] = _attach_array(pheromones_spec) if pheromones_spec else None
+
+
+def _run_island(island, seed, n_iterations, exchange_every, exchange, blend, aco_kwargs):
+    """Evolve one colony, meeting the other islands every exchange_every iterations."""
+    barrier = _island['barrier']
+    try:
+        aco = AntColonyOptimizer(_island['distances'], seed=seed, **aco_kwargs)
+        best_path = None
+        best_path_length = float('inf')
+        all_best_path_lengths = []
+        
+        for i in range(n_iterations):
+            current_best_path, current_best_path_length = aco.step()
+            if current_best_path_length < best_path_length:
+                best_path = current_best_path
+                best_path_length = current_best_path_length
             
+            if (i + 1) % exchange_every == 0 and i + 1 < n_iterations:
+                if exchange == "best":
+                    best_path, best_path_length = _exchange_best(aco, island, best_path, best_path_length)
+                else:
+                    _exchange_pheromones(aco, island, blend)
+            
+            all_best_path_lengths.append(best_path_length)
+    except BaseException:
+        barrier.abort()  # Release the other islands instead of leaving them waiting
+        raise
+    return best_path, best_path_length, all_best_path_lengths
+
+
+def _exchange_best(aco, island, best_path, best_path_length):
+    """Publish this island's best tour and reinforce the best tour of all islands."""
+    barrier, tours, lengths = _island['barrier'], _island['tours'], _island['lengths']
+    tours[island] = best_path
+    lengths[island] = best_path_length
+    barrier.wait()
+    
+    winner = int(np.argmin(lengths))
+    if winner != island:
+        best_path = tours[winner].tolist()
+        best_path_length = float(lengths[winner])
+        aco.deposit_pheromones([(best_path, best_path_length)])
+    barrier.wait()  # Nobody overwrites the shared slots before everyone has read them
+    return best_path, best_path_length
+
+
+def _exchange_pheromones(aco, island, blend):
+    """Move this island's pheromones towards the mean of all islands."""
+    barrier, shared = _island['barrier'], _island['pheromones']
+    compact = isinstance(aco.pheromones, CompactPheromones)
+    own = aco.pheromones.effective() if compact else aco.pheromones
+    shared[island] = own
+    barrier.wait()
+    
+    blended = (1.0 - blend) * own + blend * shared.mean(axis=0)
+    if compact:
+        aco.pheromones.assign(blended)
+    else:
+        aco.pheromones[:] = blended
+    barrier.wait()
+
+
+def _shared_array(segments, shape, dtype):
+    """Allocate a zeroed shared-memory array and return it with its spec."""
+    nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    shm = SharedMemory(create=True, size=nbytes)
+    segments.append(shm)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    array.fill(0)
+    return array, (shm.name, shape, np.dtype(dtype).str)
+
+
+def run_islands(distances, n_iterations, n_islands=4, exchange_every=10,
+                exchange="best", blend=0.5, seed=None, **aco_kwargs):
+    """
+    Run n_islands independent colonies in a process pool.
+    
+    Every colony has its own pheromones and seed. Every exchange_every
+    iterations the colonies either all reinforce the best tour found by any
+    island (exchange="best") or blend their pheromones with the mean of all
+    islands (exchange="pheromone", weight blend). The distance matrix, tours
+    and pheromones travel through shared memory rather than being pickled;
+    a memory-mapped .npy matrix from load_tsplib is mapped by every worker.
+    
+    Remaining keyword arguments are passed to every AntColonyOptimizer.
+    
+    Returns the global best path, its length and one convergence curve per
+    island, each shaped like the all_best_path_lengths list returned by run.
+    """
+    if exchange not in ("best", "pheromone"):
+        raise ValueError(f"Unknown exchange mode: {exchange!r}")
+    if distances is not None:
+        n_cities = len(distances)
+    else:
+        n_cities = len(aco_kwargs['x_coords'])
+    if aco_kwargs.get('n_candidates') is not None:
+        pheromone_shape = (n_cities, min(aco_kwargs['n_candidates'], n_cities - 1))
+    elif aco_kwargs.get('compact_pheromones'):
+        pheromone_shape = (n_cities * (n_cities - 1) // 2,)
+    else:
+        pheromone_shape = (n_cities, n_cities)
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n_islands)]
+    
+    segments = []
+    try:
+        distances_spec = None
+        if isinstance(distances, np.memmap) and str(distances.filename).endswith('.npy'):
+            distances_spec = str(distances.filename)
+        elif distances is not None:
+            shared_distances, distances_spec = _shared_array(segments, (n_cities, n_cities), np.float64)
+            shared_distances[:] = distances
+        _, tours_spec = _shared_array(segments, (n_islands, n_cities), np.intp)
+        _, lengths_spec = _shared_array(segments, (n_islands,), np.float64)
+        pheromones_spec = None
+        if exchange == "pheromone":
+            _, pheromones_spec = _shared_array(segments, (n_islands,) + pheromone_shape, np.float64)
+        
+        # Every island must run at once because they meet at the barrier
+        with ProcessPoolExecutor(max_workers=n_islands, initializer=_init_island,
+                                 initargs=(Barrier(n_islands), distances_spec, tours_spec,
+                                           lengths_spec, pheromones_spec)) as pool:
+            futures = [pool.submit(_run_island, island, seeds[island], n_iterations,
+                                   exchange_every, exchange, blend, aco_kwargs)
+                       for island in range(n_islands)]
+            results = [future.result() for future in futures]
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+    
+    best_path, best_path_length, _ = min(results, key=lambda result: result[1])
+    return best_path, best_path_length, [curve for _, _, curve in results]
 
-def generate_random_cities(n_cities, seed=None):
-    """Generate random city coordinates."""
+
+def generate_random_cities(n_cities, seed=None, dense=True):
+    """
+    Generate random city coordinates.
+    
+    With dense=False no distance matrix is built and None is returned in its
+    place, for use with candidate lists on large instances.
+    """
     if seed is not None:
         np.random.seed(seed)
     
@@ -142,14 +756,11 @@ def generate_random_cities(n_cities, seed=None):
     x_coords = np.random.rand(n_cities) * 100
     y_coords = np.random.rand(n_cities) * 100
     
+    if not dense:
+        return None, x_coords, y_coords
+    
     # Calculate distance matrix
-    distances = np.zeros((n_cities, n_cities))
-    for i in range(n_cities):
-        for j in range(n_cities):
-            if i != j:
-                # Euclidean distance
-                distances[i, j] = np.sqrt((x_coords[i] - x_coords[j])**2 + 
-                                         (y_coords[i] - y_coords[j])**2)
+    distances = euclidean_distances(x_coords, y_coords)
     
     return distances, x_coords, y_coords
 
@@ -192,8 +803,13 @@ def main():
     n_ants = 20
     n_iterations = 100
     
-    # Generate random cities
-    distances, x_coords, y_coords = generate_random_cities(n_cities, seed=42)
+    # Load a TSPLIB instance if one is given, otherwise generate random cities
+    if len(sys.argv) > 1:
+        distances, x_coords, y_coords = load_tsplib(sys.argv[1], cache_dir=".aco-cache")
+        weight_type = edge_weight_type(sys.argv[1])
+    else:
+        distances, x_coords, y_coords = generate_random_cities(n_cities, seed=42)
+        weight_type = None
     
     # Print distance matrix
     print("Distance Matrix:")
@@ -208,7 +824,8 @@ def main():
         n_ants=n_ants,
         decay=0.95,
         alpha=1.0,
-        beta=2.0
+        beta=2.0,
+        weight_type=weight_type
     )
     
     best_path, best_path_length, all_best_path_lengths = aco.run(n_iterations)
@@ -221,9 +838,12 @@ def main():
     print(f"Best path: {best_path}")
     print(f"Best path length: {best_path_length:.2f}")
     print(f"Algorithm run time: {run_time:.2f} seconds")
+    print(f"Construction time: {aco.timings['construction']:.2f} seconds, "
+          f"local search time: {aco.timings['local_search']:.2f} seconds")
     
     # Plot the best path
-    plot_path(x_coords, y_coords, best_path, f'Best TSP Path (Length: {best_path_length:.2f})')
+    if x_coords is not None:
+        plot_path(x_coords, y_coords, best_path, f'Best TSP Path (Length: {best_path_length:.2f})')
     
     # Plot convergence
     plot_convergence(all_best_path_lengths)
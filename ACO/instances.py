@@ -0,0 +1,263 @@
+import hashlib
+import os
+
+import numpy as np
+
+# Distance functions supported for NODE_COORD_SECTION instances
+COORD_TYPES = ("EUC_2D", "CEIL_2D", "ATT", "GEO")
+
+
+def read_tsplib(path, read_weights=True):
+    """
+    Parse a TSPLIB file.
+
+    Returns a dict with the header fields (upper-case keys), plus 'coords'
+    for NODE_COORD_SECTION / DISPLAY_DATA_SECTION data and 'weights' for the
+    flat EDGE_WEIGHT_SECTION numbers. With read_weights=False the edge weight
+    section is skipped, which is what a cached matrix needs.
+    """
+    problem = {'coords': None, 'weights': None}
+    section, rows = None, []
+
+    def close_section():
+        if section in ("NODE_COORD_SECTION", "DISPLAY_DATA_SECTION") and rows:
+            data = np.array(rows, dtype=float)
+            data = data[np.argsort(data[:, 0], kind='stable')]
+            # Display data is only used when no real coordinates exist
+            if section == "NODE_COORD_SECTION" or problem['coords'] is None:
+                problem['coords'] = data[:, 1:3]
+        elif section == "EDGE_WEIGHT_SECTION" and rows:
+            problem['weights'] = np.array(rows, dtype=float)
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            keyword = line.split(":")[0].strip().upper()
+            if keyword == "EOF":
+                break
+            if keyword.endswith("_SECTION"):
+                close_section()
+                section, rows = keyword, []
+                continue
+            if ":" in line and not line[0].isdigit() and line[0] not in "-+.":
+                close_section()
+                section, rows = None, []
+                key, value = line.split(":", 1)
+                problem[key.strip().upper()] = value.strip()
+                continue
+
+            if section in ("NODE_COORD_SECTION", "DISPLAY_DATA_SECTION"):
+                rows.append(line.split()[:3])
+            elif section == "EDGE_WEIGHT_SECTION" and read_weights:
+                rows.extend(line.split())
+        close_section()
+
+    if 'DIMENSION' not in problem:
+        raise ValueError(f"{path}: missing DIMENSION")
+    problem['DIMENSION'] = int(problem['DIMENSION'])
+    return problem
+
+
+def edge_weight_type(path):
+    """The EDGE_WEIGHT_TYPE of a TSPLIB file, read from its header only ("EXPLICIT" if missing)."""
+    with open(path) as f:
+        for line in f:
+            keyword = line.split(":")[0].strip().upper()
+            if keyword.endswith("_SECTION") or keyword == "EOF":
+                break
+            if keyword == "EDGE_WEIGHT_TYPE":
+                return line.split(":", 1)[1].strip().upper()
+    return "EXPLICIT"
+
+
+def load_tsplib(path, cache_dir=None, min_cached_cities=1000):
+    """
+    Load a TSPLIB instance as (distances, x_coords, y_coords).
+
+    Supports EUC_2D, CEIL_2D, ATT and GEO coordinates and EXPLICIT matrices.
+    The coordinates are None when the file has no coordinate or display data.
+    edge_weight_type(path) tells how the matrix relates to the coordinates.
+
+    If cache_dir is given and the instance has at least min_cached_cities
+    cities, the matrix is written once to a .npy file there and opened with
+    np.memmap afterwards. Later runs then skip the computation, and processes
+    that open the same file share its pages through the page cache.
+    """
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = _cache_path(path, cache_dir)
+        if os.path.exists(cache_path):
+            problem = read_tsplib(path, read_weights=False)
+            x_coords, y_coords = _split_coords(problem['coords'])
+            return np.load(cache_path, mmap_mode='r'), x_coords, y_coords
+
+    problem = read_tsplib(path)
+    n_cities = problem['DIMENSION']
+    x_coords, y_coords = _split_coords(problem['coords'])
+
+    out = None
+    if cache_path is not None and n_cities >= min_cached_cities:
+        os.makedirs(cache_dir, exist_ok=True)
+        partial_path = f"{cache_path}.{os.getpid()}.partial.npy"
+        out = np.lib.format.open_memmap(partial_path, mode='w+', dtype=np.float64,
+                                        shape=(n_cities, n_cities))
+
+    distances = tsplib_distances(problem, out=out)
+
+    if out is not None:
+        out.flush()
+        del out, distances
+        os.replace(partial_path, cache_path)  # Readers never see a half-written matrix
+        distances = np.load(cache_path, mmap_mode='r')
+    return distances, x_coords, y_coords
+
+
+def tsplib_distances(problem, out=None):
+    """Build the distance matrix of a problem returned by read_tsplib."""
+    n_cities = problem['DIMENSION']
+    weight_type = problem.get('EDGE_WEIGHT_TYPE', 'EXPLICIT').upper()
+    if weight_type == "EXPLICIT":
+        return explicit_distances(problem['weights'], n_cities,
+                                  problem.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'), out=out)
+    if weight_type not in COORD_TYPES:
+        raise ValueError(f"Unsupported EDGE_WEIGHT_TYPE: {weight_type}")
+    if problem['coords'] is None or len(problem['coords']) != n_cities:
+        raise ValueError(f"{weight_type} instance needs {n_cities} node coordinates")
+
+    x_coords, y_coords = problem['coords'][:, 0], problem['coords'][:, 1]
+    if weight_type == "GEO":
+        return geo_distances(x_coords, y_coords, out=out)
+    return euclidean_distances(x_coords, y_coords, rounding=weight_type, out=out)
+
+
+def euclidean_distances(x_coords, y_coords, rounding=None, out=None, block_rows=1024):
+    """
+    Euclidean distance matrix, computed with broadcasting one block of rows at a time.
+
+    rounding follows TSPLIB: "EUC_2D" rounds to the nearest integer,
+    "CEIL_2D" rounds up and "ATT" uses the pseudo-Euclidean distance. None
+    keeps the exact distances.
+    """
+    x_coords = np.asarray(x_coords, dtype=float)
+    y_coords = np.asarray(y_coords, dtype=float)
+    n_cities = len(x_coords)
+    if out is None:
+        out = np.empty((n_cities, n_cities))
+
+    for start in range(0, n_cities, block_rows):
+        stop = min(start + block_rows, n_cities)
+        out[start:stop] = _euclidean_block(x_coords[start:stop, None] - x_coords[None, :],
+                                           y_coords[start:stop, None] - y_coords[None, :], rounding)
+    return out
+
+
+def _euclidean_block(dx, dy, rounding):
+    if rounding == "ATT":
+        exact = np.sqrt((dx ** 2 + dy ** 2) / 10.0)
+        rounded = np.floor(exact + 0.5)
+        return np.where(rounded < exact, rounded + 1, rounded)
+    block = np.sqrt(dx ** 2 + dy ** 2)
+    if rounding == "EUC_2D":
+        block = np.floor(block + 0.5)
+    elif rounding == "CEIL_2D":
+        block = np.ceil(block)
+    return block
+
+
+def geo_distances(latitudes, longitudes, out=None, block_rows=1024):
+    """TSPLIB GEO distances (DDD.MM coordinates on an idealized sphere), in row blocks."""
+    lat, lon = _geo_radians(latitudes), _geo_radians(longitudes)
+    n_cities = len(lat)
+    if out is None:
+        out = np.empty((n_cities, n_cities))
+
+    for start in range(0, n_cities, block_rows):
+        stop = min(start + block_rows, n_cities)
+        block = _geo_block(lat[start:stop, None], lon[start:stop, None], lat[None, :], lon[None, :])
+        rows = np.arange(start, stop)
+        block[rows - start, rows] = 0.0  # TSPLIB only defines i != j
+        out[start:stop] = block
+    return out
+
+
+def _geo_radians(coords):
+    """TSPLIB DDD.MM degrees (minutes after the point) as radians, with TSPLIB's value of pi."""
+    coords = np.asarray(coords, dtype=float)
+    degrees = np.trunc(coords)
+    return 3.141592 * (degrees + 5.0 * (coords - degrees) / 3.0) / 180.0
+
+
+def _geo_block(lat_from, lon_from, lat_to, lon_to):
+    q1 = np.cos(lon_from - lon_to)
+    q2 = np.cos(lat_from - lat_to)
+    q3 = np.cos(lat_from + lat_to)
+    cosine = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+    return np.trunc(6378.388 * np.arccos(cosine) + 1.0)
+
+
+def coordinate_distances(x_coords, y_coords, rows, weight_type=None):
+    """
+    Distances from the cities in rows to every city, as a (len(rows), n) array.
+
+    weight_type is one of COORD_TYPES, computed exactly as in the full
+    matrix of a TSPLIB instance, or None for exact Euclidean distances.
+    """
+    if weight_type is not None and weight_type not in COORD_TYPES:
+        raise ValueError(f"Distances cannot be computed from coordinates for {weight_type}")
+    rows = np.asarray(rows, dtype=np.intp)
+    if weight_type == "GEO":
+        lat, lon = _geo_radians(x_coords), _geo_radians(y_coords)
+        block = _geo_block(lat[rows, None], lon[rows, None], lat[None, :], lon[None, :])
+        block[np.arange(len(rows)), rows] = 0.0
+        return block
+    x_coords = np.asarray(x_coords, dtype=float)
+    y_coords = np.asarray(y_coords, dtype=float)
+    return _euclidean_block(x_coords[rows, None] - x_coords[None, :],
+                            y_coords[rows, None] - y_coords[None, :], weight_type)
+
+
+def explicit_distances(weights, n_cities, weight_format, out=None):
+    """Expand a TSPLIB EDGE_WEIGHT_SECTION into a full symmetric matrix."""
+    weight_format = weight_format.upper()
+    if out is None:
+        out = np.empty((n_cities, n_cities))
+
+    if weight_format == "FULL_MATRIX":
+        out[:] = np.asarray(weights[:n_cities * n_cities]).reshape(n_cities, n_cities)
+        return out
+
+    # Column-wise formats list the same numbers as the mirrored row-wise ones
+    aliases = {"UPPER_COL": "LOWER_ROW", "LOWER_COL": "UPPER_ROW",
+               "UPPER_DIAG_COL": "LOWER_DIAG_ROW", "LOWER_DIAG_COL": "UPPER_DIAG_ROW"}
+    weight_format = aliases.get(weight_format, weight_format)
+    triangles = {
+        "UPPER_ROW": lambda: np.triu_indices(n_cities, k=1),
+        "LOWER_ROW": lambda: np.tril_indices(n_cities, k=-1),
+        "UPPER_DIAG_ROW": lambda: np.triu_indices(n_cities),
+        "LOWER_DIAG_ROW": lambda: np.tril_indices(n_cities),
+    }
+    if weight_format not in triangles:
+        raise ValueError(f"Unsupported EDGE_WEIGHT_FORMAT: {weight_format}")
+
+    rows, cols = triangles[weight_format]()
+    out[:] = 0.0
+    out[rows, cols] = weights[:len(rows)]
+    out[cols, rows] = weights[:len(rows)]
+    return out
+
+
+def _split_coords(coords):
+    if coords is None:
+        return None, None
+    return coords[:, 0].copy(), coords[:, 1].copy()
+
+
+def _cache_path(path, cache_dir):
+    """Cache file name tied to the instance file's path, size and modification time."""
+    stat = os.stat(path)
+    key = f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}-{digest}.npy")
@@ -0,0 +1,192 @@
+import math
+from collections import deque
+
+import numpy as np
+
+MOVES = ("2-opt", "or-opt")
+
+
+def neighbour_lists(distances, k):
+    """Return the k nearest neighbours of every city in a distance matrix, closest first."""
+    distances = np.asarray(distances, dtype=float)
+    n_cities = len(distances)
+    k = min(k, n_cities - 1)
+    neighbours = np.empty((n_cities, k), dtype=np.intp)
+    for start in range(0, n_cities, 1024):  # Row blocks keep the temporaries small
+        rows = distances[start:start + 1024].copy()
+        rows[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+        nearest = np.argpartition(rows, k - 1, axis=1)[:, :k]
+        ranked = np.argsort(np.take_along_axis(rows, nearest, axis=1), axis=1, kind='stable')
+        neighbours[start:start + len(rows)] = np.take_along_axis(nearest, ranked, axis=1)
+    return neighbours
+
+
+def matrix_distance(distances):
+    """Wrap a distance matrix (ndarray or list of lists) as a dist(a, b) function."""
+    if isinstance(distances, np.ndarray):
+        return distances.item
+    return lambda a, b: distances[a][b]
+
+
+def coordinate_distance(x_coords, y_coords):
+    """Wrap city coordinates as a Euclidean dist(a, b) function."""
+    xs, ys = list(map(float, x_coords)), list(map(float, y_coords))
+    return lambda a, b: math.hypot(xs[a] - xs[b], ys[a] - ys[b])
+
+
+def improve_tour(tour, dist, neighbours, moves=MOVES):
+    """
+    Improve a closed tour with 2-opt and/or Or-opt moves until no move helps.
+
+    Only moves towards a city's neighbours are tried, and every city carries a
+    don't-look bit: it is examined again only after an edge next to it has
+    changed. Each candidate move is priced in O(1) from the four or six edges
+    it touches, so one pass over the tour is close to linear in its length.
+
+    Parameters:
+    - tour: sequence of city indices
+    - dist: function returning the distance between two cities
+    - neighbours: per-city neighbour indices, closest first
+    - moves: any of "2-opt" and "or-opt"
+
+    Returns the improved tour as a list and the total length it saved.
+    """
+    unknown = set(moves) - set(MOVES)
+    if unknown:
+        raise ValueError(f"Unknown local search moves: {sorted(unknown)}")
+    tour = [int(city) for city in tour]
+    n_cities = len(tour)
+    if n_cities < 5:
+        return tour, 0.0
+    neighbours = [[int(city) for city in row] for row in neighbours]
+    pos = [0] * n_cities
+    for i, city in enumerate(tour):
+        pos[city] = i
+
+    # Cities whose don't-look bit is off
+    queue = deque(tour)
+    queued = [True] * n_cities
+    total_gain = 0.0
+
+    while queue:
+        city = queue.popleft()
+        queued[city] = False
+
+        result = None
+        if "2-opt" in moves:
+            result = _two_opt_move(tour, pos, city, dist, neighbours)
+        if result is None and "or-opt" in moves:
+            result = _or_opt_move(tour, pos, city, dist, neighbours)
+        if result is None:
+            continue
+
+        gain, touched = result
+        total_gain += gain
+        for other in touched:
+            if not queued[other]:
+                queued[other] = True
+                queue.append(other)
+
+    return tour, total_gain
+
+
+def _two_opt_move(tour, pos, a, dist, neighbours):
+    """Apply the first improving 2-opt move around city a, if there is one."""
+    n_cities = len(tour)
+    for forward in (True, False):
+        i = pos[a]
+        b = tour[(i + 1) % n_cities] if forward else tour[i - 1]
+        d_ab = dist(a, b)
+        for c in neighbours[a]:
+            d_ac = dist(a, c)
+            if d_ac >= d_ab:
+                break  # Neighbours are sorted, so no later c can help
+            j = pos[c]
+            d = tour[(j + 1) % n_cities] if forward else tour[j - 1]
+            if c == b or d == a:
+                continue
+
+            # Replace edges (a, b) and (c, d) by (a, c) and (b, d)
+            delta = d_ac + dist(b, d) - d_ab - dist(c, d)
+            if delta < -1e-10:
+                if forward:
+                    _reverse(tour, pos, pos[b], pos[c])
+                else:
+                    _reverse(tour, pos, pos[a], pos[d])
+                return -delta, (a, b, c, d)
+    return None
+
+
+def _or_opt_move(tour, pos, a, dist, neighbours, max_segment=3):
+    """Move a segment of up to max_segment cities starting at a, if that helps."""
+    n_cities = len(tour)
+    i = pos[a]
+    for seg_len in range(1, min(max_segment, n_cities - 3) + 1):
+        segment = [tour[(i + t) % n_cities] for t in range(seg_len)]
+        prev_city = tour[i - 1]
+        next_city = tour[(i + seg_len) % n_cities]
+        first, last = segment[0], segment[-1]
+        removal_gain = dist(prev_city, first) + dist(last, next_city) - dist(prev_city, next_city)
+        if removal_gain <= 1e-10:
+            continue
+
+        in_segment = set(segment)
+        for end, other in ((first, last), (last, first)):
+            for c in neighbours[end]:
+                d_c = dist(c, end)
+                if d_c >= removal_gain:
+                    break
+                if c in in_segment:
+                    continue
+                j = pos[c]
+                for e in (tour[(j + 1) % n_cities], tour[j - 1]):
+                    if e in in_segment:
+                        continue
+
+                    # Insert the segment between c and e, with end next to c
+                    delta = d_c + dist(other, e) - dist(c, e) - removal_gain
+                    if delta < -1e-10:
+                        _move_segment(tour, pos, i, seg_len, end == first, c, e == tour[(j + 1) % n_cities])
+                        return -delta, (prev_city, next_city, first, last, c, e)
+    return None
+
+
+def _reverse(tour, pos, i, j):
+    """Reverse the cyclic stretch of the tour from position i to position j."""
+    n_cities = len(tour)
+    length = (j - i) % n_cities + 1
+    if 2 * length > n_cities:
+        # Reversing the rest of the tour gives the same cycle with less work
+        i, j = (j + 1) % n_cities, (i - 1) % n_cities
+        length = n_cities - length
+    for _ in range(length // 2):
+        city_i, city_j = tour[i], tour[j]
+        tour[i], pos[city_j] = city_j, i
+        tour[j], pos[city_i] = city_i, j
+        i = (i + 1) % n_cities
+        j = (j - 1) % n_cities
+
+
+def _move_segment(tour, pos, start, seg_len, keep_order, c, after_c):
+    """Cut seg_len cities from position start and reinsert them next to city c."""
+    n_cities = len(tour)
+    segment = [tour[(start + t) % n_cities] for t in range(seg_len)]
+    # The segment end that was priced next to c must end up touching c
+    if keep_order != after_c:
+        segment.reverse()
+
+    # Only the cities between the segment and the gap it moves into change places:
+    # they shift by seg_len, on whichever side of the tour is shorter
+    gap = (pos[c] + 1) % n_cities if after_c else pos[c]
+    forward = (gap - start - seg_len) % n_cities
+    backward = (start - gap) % n_cities
+    if forward <= backward:
+        moved = [tour[(start + seg_len + t) % n_cities] for t in range(forward)] + segment
+        first = start
+    else:
+        moved = segment + [tour[(gap + t) % n_cities] for t in range(backward)]
+        first = gap
+    for t, city in enumerate(moved):
+        idx = (first + t) % n_cities
+        tour[idx] = city
+        pos[city] = idx
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def nearest_neighbours(x_coords, y_coords, k):
+    """
+    Find the k nearest neighbours of every city using a uniform grid.
+
+    The plane is split into square cells holding about two cities each. Each
+    cell's cities are compared only against the cities in the surrounding
+    block of cells, and the block is widened until the k-th neighbour is
+    guaranteed to lie inside it. Memory stays O(n * k) instead of O(n^2).
+
+    Returns an (n, k) array of city indices, each row sorted by distance.
+    """
+    coords = np.column_stack((x_coords, y_coords)).astype(float)
+    n_cities = len(coords)
+    k = min(k, n_cities - 1)
+    neighbours = np.empty((n_cities, k), dtype=np.intp)
+    if k <= 0:
+        return neighbours
+
+    # Bin every city into a side x side grid
+    side = max(1, int(np.sqrt(n_cities / 2)))
+    low = coords.min(axis=0)
+    extent = coords.max(axis=0) - low
+    cell_size = np.where(extent > 0, extent / side, 1.0)
+    cell_xy = np.minimum(((coords - low) / cell_size).astype(np.intp), side - 1)
+    cell_ids = cell_xy[:, 0] * side + cell_xy[:, 1]
+
+    order = np.argsort(cell_ids, kind='stable')
+    starts = np.searchsorted(cell_ids[order], np.arange(side * side + 1))
+
+    for cell in np.unique(cell_ids):
+        members = order[starts[cell]:starts[cell + 1]]
+        cx, cy = divmod(int(cell), side)
+        radius = 1
+        while True:
+            x_lo, x_hi = max(cx - radius, 0), min(cx + radius, side - 1)
+            y_lo, y_hi = max(cy - radius, 0), min(cy + radius, side - 1)
+            block = np.concatenate([
+                order[starts[gx * side + y_lo]:starts[gx * side + y_hi + 1]]
+                for gx in range(x_lo, x_hi + 1)
+            ])
+            covers_grid = x_lo == 0 and y_lo == 0 and x_hi == side - 1 and y_hi == side - 1
+
+            if len(block) > k:
+                diff = coords[members, None, :] - coords[None, block, :]
+                dist = np.sqrt((diff ** 2).sum(axis=2))
+                dist[members[:, None] == block[None, :]] = np.inf
+                nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                nearest_dist = np.take_along_axis(dist, nearest, axis=1)
+
+                # Anything outside the block is at least `radius` cells away
+                if covers_grid or nearest_dist.max() <= radius * cell_size.min():
+                    ranked = np.argsort(nearest_dist, axis=1, kind='stable')
+                    neighbours[members] = block[np.take_along_axis(nearest, ranked, axis=1)]
+                    break
+            radius += 1
+
+    return neighbours
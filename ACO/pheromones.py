@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class CompactPheromones:
+    """
+    Symmetric pheromone matrix that stores only its upper triangle, in float32.
+
+    Decay is applied lazily: the stored values are multiplied by a running
+    scale factor when read, and deposits are divided by it when written. The
+    values are only rewritten once the factor gets small enough to cost
+    precision, so a decay step is O(1) and a deposit is O(edges touched).
+    """
+
+    def __init__(self, n_cities, initial=1.0, renormalize_below=1e-4):
+        self.n_cities = n_cities
+        self.values = np.full(n_cities * (n_cities - 1) // 2, initial, dtype=np.float32)
+        self.scale = 1.0
+        self.renormalize_below = renormalize_below
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def index(self, city_from, city_to):
+        """Position of the edges (city_from, city_to) in self.values; i != j."""
+        low = np.minimum(city_from, city_to).astype(np.int64)
+        high = np.maximum(city_from, city_to).astype(np.int64)
+        return low * (2 * self.n_cities - low - 1) // 2 + (high - low - 1)
+
+    def __getitem__(self, edge):
+        city_from, city_to = edge
+        if np.isscalar(city_from) and np.isscalar(city_to):
+            if city_from == city_to:
+                return 0.0
+            return float(self.values[self.index(city_from, city_to)]) * self.scale
+        city_from, city_to = np.broadcast_arrays(city_from, city_to)
+        result = np.zeros(city_from.shape)
+        off_diagonal = city_from != city_to
+        result[off_diagonal] = self.values[self.index(city_from[off_diagonal], city_to[off_diagonal])]
+        return result * self.scale
+
+    def rows(self, cities):
+        """Dense float64 rows of the matrix for the given cities; the diagonal reads as 0."""
+        cities = np.asarray(cities)
+        return self[cities[:, None], np.arange(self.n_cities)[None, :]]
+
+    def row(self, city):
+        """Dense float64 row of a single city, cheaper than rows([city])[0]."""
+        city = int(city)
+        result = np.empty(self.n_cities)
+        result[city] = 0.0
+        # Edges to higher cities are one contiguous stretch of the upper triangle
+        start = self.index(city, city + 1) if city + 1 < self.n_cities else 0
+        result[city + 1:] = self.values[start:start + self.n_cities - city - 1]
+        result[:city] = self.values[self.index(np.arange(city), city)]
+        return result * self.scale
+
+    def decay(self, factor):
+        """Multiply every pheromone by factor."""
+        self.scale *= factor
+        if self.scale < self.renormalize_below:
+            self.values *= np.float32(self.scale)
+            self.scale = 1.0
+
+    def deposit(self, city_from, city_to, amounts):
+        """Add amounts to the edges (city_from, city_to) in one scatter-add."""
+        city_from, city_to, amounts = np.broadcast_arrays(city_from, city_to, amounts)
+        off_diagonal = city_from != city_to
+        np.add.at(self.values, self.index(city_from[off_diagonal], city_to[off_diagonal]),
+                  (amounts[off_diagonal] / self.scale).astype(np.float32))
+
+    def effective(self):
+        """The upper triangle with decay applied, as float64."""
+        return self.values * self.scale
+
+    def assign(self, effective):
+        """Replace the upper triangle with already decayed values."""
+        self.values[:] = effective
+        self.scale = 1.0
+
+    def mean(self):
+        return float(self.effective().mean()) if len(self.values) else 1.0
+
+    def resized(self, keep, n_cities, level=None):
+        """
+        A new store for n_cities cities where city i < len(keep) is old city keep[i].
+
+        Pheromone between surviving cities is kept; every other edge starts
+        at level, by default the mean of the current pheromone levels.
+        """
+        if level is None:
+            level = self.mean()
+        resized = CompactPheromones(n_cities, initial=level, renormalize_below=self.renormalize_below)
+        keep = np.asarray(keep)
+        for i in range(len(keep) - 1):
+            # Row i of the new upper triangle, restricted to surviving cities
+            resized.values[resized.index(i, i + 1):resized.index(i, len(keep) - 1) + 1] = \
+                self.values[self.index(keep[i], keep[i + 1:])] * self.scale
+        return resized
+
+    def reset_edges(self, cities, level=None):
+        """Set every edge touching the given cities to level (default: the mean level)."""
+        if level is None:
+            level = self.mean()
+        others = np.arange(self.n_cities)
+        for city in np.atleast_1d(cities):
+            rest = others[others != city]
+            self.values[self.index(city, rest)] = level / self.scale
+
+    def to_dense(self):
+        """The full symmetric matrix as float64."""
+        dense = np.zeros((self.n_cities, self.n_cities))
+        upper = np.triu_indices(self.n_cities, k=1)
+        dense[upper] = self.effective()
+        dense.T[upper] = dense[upper]
+        return dense